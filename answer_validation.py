@@ -1,11 +1,9 @@
-from google import genai
 from google.genai import types
-from config import GEMINI_API_KEY
+from typing import Optional
+from config import PRIMARY_MODEL, FAST_MODEL
+from llm_calls import TurnBudget, generate_content, mark_degraded
 from models import ValidateAnswer
 
-# Initialize Google Generative AI client
-client = genai.Client(api_key=GEMINI_API_KEY)
-
 # System instruction for the validator
 SYSTEM_INSTRUCTION_VALIDATOR = """Based on the user and model interaction, determine if the question can be answered directly from SQL results or if RAG-based search is required.
 
@@ -106,12 +104,13 @@ IMPORTANT NOTES:
 4. Use rag_filter appropriately when the user specifies genres, years, actors, or ratings
 """
 
-def validate_movie_query_response(conversation_history):
+async def validate_movie_query_response(conversation_history, budget: Optional[TurnBudget] = None):
     """
     Validate if SQL results properly answer the user's query or if RAG search is needed.
     
     Args:
         conversation_history: Conversation history between user and model
+        budget: Optional latency budget for the current turn
         
     Returns:
         ValidateAnswer object with validation results
@@ -126,11 +125,23 @@ def validate_movie_query_response(conversation_history):
     )
     
     # Make the API call to Gemini
-    response = client.models.generate_content(
-        model="gemini-2.5-flash-preview-04-17",
-        config=config,
-        contents=conversation_history
-    )
+    try:
+        response = await generate_content(
+            "validation",
+            model=PRIMARY_MODEL,
+            config=config,
+            contents=conversation_history,
+            budget=budget,
+            fallback_model=FAST_MODEL,
+            cache_prompt=True
+        )
+    except Exception as e:
+        print(f"❌ Error validating SQL results: {str(e)}")
+        mark_degraded(budget, "validation", e)
+        return ValidateAnswer(
+            direct_answer="I'm sorry, I couldn't answer that in time. Please try again.",
+            reason=f"Error: {str(e)}"
+        )
     
     # The response.parsed will automatically convert to the Pydantic model
     validation_result = response.parsed
@@ -0,0 +1,26 @@
+import asyncio
+from typing import List
+
+def report_background_failure(task: asyncio.Task) -> None:
+    """Log a background task that stopped with an error instead of leaving it unretrieved."""
+    if not task.cancelled() and task.exception() is not None:
+        print(f"❌ Background task '{task.get_name()}' stopped: {str(task.exception())}")
+
+def start_background_task(coroutine, name: str, background_tasks: List[asyncio.Task]) -> None:
+    """
+    Run a long-lived coroutine next to the main work.
+
+    Args:
+        coroutine: Coroutine to run
+        name: Task name used in error messages
+        background_tasks: List holding the tasks, so they are not garbage-collected and can be cancelled on exit
+    """
+    task = asyncio.create_task(coroutine, name=name)
+    task.add_done_callback(report_background_failure)
+    background_tasks.append(task)
+
+async def stop_background_tasks(background_tasks: List[asyncio.Task]) -> None:
+    """Cancel the background tasks and wait for them to finish."""
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
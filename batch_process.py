@@ -0,0 +1,204 @@
+"""
+Run a file of questions through the chatbot pipeline offline.
+
+Input is JSONL with one {"id": ..., "question": ...} object per line (id
+defaults to the line number). Every question runs as its own session; N
+sessions run concurrently and share the pooled DB, vector and LLM clients.
+Results are appended to the output JSONL as soon as each question finishes, so
+an interrupted run can be resumed by running the same command again. Questions
+that failed are retried on resume, so an id may appear more than once; the
+last record for an id is the current one.
+
+Usage:
+    python batch_process.py questions.jsonl answers.jsonl --concurrency 8
+"""
+import os
+import sys
+import json
+import math
+import time
+import asyncio
+import argparse
+import contextlib
+from typing import Dict, Set, Iterator, Tuple
+from google.genai import types
+from db_connector import get_db_pool, close_db_pool
+from background_tasks import start_background_task, stop_background_tasks
+from movie_view import movie_search_refresher
+from config import MOVIE_SEARCH_AUTO_REFRESH
+from llm_calls import TurnBudget, format_llm_call_stats
+from rag_prefetch import format_prefetch_stats
+from prompt_cache import get_prompt_cache, format_prompt_cache_stats
+from movie_db import process_user_query
+
+def read_questions(path: str) -> Iterator[Tuple[str, str]]:
+    """Lazily yield (id, question) pairs from a JSONL file, skipping and reporting malformed lines."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+                question = record["question"]
+            except (ValueError, KeyError, TypeError) as e:
+                print(f"⚠️ Skipping line {line_number}: expected a JSON object with a question ({e!r})",
+                      file=sys.stderr)
+                continue
+            yield str(record.get("id", line_number)), question
+
+def read_completed_ids(path: str) -> Set[str]:
+    """Ids answered successfully in a (possibly partial) output file; failed ones are retried."""
+    completed = set()
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    if "error" in record or record.get("answer") is None:
+                        continue
+                    completed.add(str(record["id"]))
+                except (ValueError, KeyError, AttributeError):
+                    # Ignore a truncated last line from an interrupted run
+                    continue
+    except FileNotFoundError:
+        pass
+    return completed
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+async def answer_question(question_id: str, question: str) -> Dict:
+    """
+    Answer one question in a fresh session.
+
+    Returns:
+        Output record with the answer, per-stage timings and total latency.
+        Turns where a stage fell back to a canned answer are recorded with
+        an error, so they count as failures and are retried on resume.
+    """
+    conversation_history = [types.Content(
+        role="user",
+        parts=[types.Part.from_text(text=question)],
+    )]
+    budget = TurnBudget()
+    started = time.perf_counter()
+    record = {"id": question_id, "question": question}
+    try:
+        record["answer"] = await process_user_query(question, conversation_history, budget)
+        if budget.degraded:
+            record["error"] = "degraded: " + "; ".join(budget.degraded)
+    except Exception as e:
+        record["answer"] = None
+        record["error"] = str(e)
+    record["latency_s"] = round(time.perf_counter() - started, 4)
+    record["timings"] = {stage: round(seconds, 4) for stage, seconds in budget.stage_timings.items()}
+    return record
+
+async def run_batch(input_path: str, output_path: str, concurrency: int,
+                    resume: bool = True, verbose: bool = False) -> None:
+    completed = read_completed_ids(output_path) if resume else set()
+    if completed:
+        print(f"⏭️ Resuming: {len(completed)} questions already answered", file=sys.stderr)
+
+    # Size the shared pool for the number of concurrent sessions
+    await get_db_pool(max_size=max(concurrency, 1))
+    
+    # Keep movie_search in step with the base tables for the whole run
+    background_tasks = []
+    if MOVIE_SEARCH_AUTO_REFRESH:
+        start_background_task(movie_search_refresher(), "movie_search refresh", background_tasks)
+
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+    latencies = []
+    stage_totals: Dict[str, float] = {}
+    errors = 0
+    started = time.perf_counter()
+
+    with open(output_path, "a" if resume else "w", encoding="utf-8") as output:
+        # Terminate a truncated last line left by an interrupted run
+        if resume and output.tell() > 0:
+            with open(output_path, "rb") as existing:
+                existing.seek(-1, os.SEEK_END)
+                if existing.read(1) != b"\n":
+                    output.write("\n")
+
+        async def worker():
+            nonlocal errors
+            while True:
+                item = await queue.get()
+                if item is None:
+                    queue.task_done()
+                    return
+                record = await answer_question(*item)
+                output.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                output.flush()
+
+                latencies.append(record["latency_s"])
+                for stage, seconds in record["timings"].items():
+                    stage_totals[stage] = stage_totals.get(stage, 0.0) + seconds
+                if "error" in record:
+                    errors += 1
+                print(f"✅ [{len(latencies)}] {record['id']} in {record['latency_s']:.2f}s", file=sys.stderr)
+                queue.task_done()
+
+        # Pipeline logs are interleaved across sessions, so they are hidden unless asked for
+        with contextlib.ExitStack() as stack:
+            if not verbose:
+                stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, "w"))))
+            workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+            try:
+                for question_id, question in read_questions(input_path):
+                    if question_id not in completed:
+                        await queue.put((question_id, question))
+            finally:
+                # Let the workers finish what was queued even if reading the input failed
+                for _ in workers:
+                    await queue.put(None)
+                await asyncio.gather(*workers)
+
+    await stop_background_tasks(background_tasks)
+    await close_db_pool()
+    await get_prompt_cache().close()
+
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    processed = len(latencies)
+    print("\n" + "=" * 50)
+    print("📊 BATCH SUMMARY")
+    print("=" * 50)
+    print(f"Questions answered: {processed} ({errors} errors) in {elapsed:.1f}s")
+    if processed:
+        print(f"Throughput: {processed / elapsed:.2f} questions/s with {concurrency} sessions")
+        print("Latency: " + ", ".join(
+            f"p{int(fraction * 100)} {percentile(latencies, fraction):.2f}s"
+            for fraction in (0.5, 0.9, 0.95, 0.99)
+        ) + f", max {latencies[-1]:.2f}s")
+        print("Mean stage time:")
+        for stage, total in stage_totals.items():
+            print(f"  {stage:<16} {total / processed:.3f}s")
+    print("\n📈 LLM call paths:")
+    print(format_llm_call_stats())
+    print(f"\n🔮 RAG prefetch: {format_prefetch_stats()}")
+    print(f"🗄️ Prompt cache: {format_prompt_cache_stats()}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of questions with concurrent sessions")
+    parser.add_argument("input", help="JSONL file with {\"id\", \"question\"} per line")
+    parser.add_argument("output", help="JSONL file answers are appended to")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent independent sessions")
+    parser.add_argument("--no-resume", action="store_true", help="Overwrite the output instead of resuming")
+    parser.add_argument("--verbose", action="store_true", help="Show pipeline logs")
+    args = parser.parse_args()
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+
+    asyncio.run(run_batch(args.input, args.output, args.concurrency,
+                          resume=not args.no_resume, verbose=args.verbose))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Cold-start benchmark: time `import movie_db` in fresh interpreters and compare
+loading the entity lists from JSON against the compiled binary cache.
+
+Run from the repository root:
+    python -m benchmarks.import_time --runs 10
+"""
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def time_in_subprocess(snippet: str, runs: int) -> list:
+    """
+    Run a Python snippet in fresh interpreters and collect wall-clock timings.
+
+    Args:
+        snippet: Code to time; it must print its own elapsed seconds
+        runs: Number of fresh interpreters to start
+
+    Returns:
+        List of elapsed times in seconds
+    """
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", snippet],
+            cwd=ROOT_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+    return timings
+
+def report(label: str, timings: list) -> None:
+    print(f"{label:<32} median {statistics.median(timings) * 1000:8.1f} ms   "
+          f"min {min(timings) * 1000:8.1f} ms   runs {len(timings)}")
+
+IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import movie_db
+print(time.perf_counter() - start)
+"""
+
+JSON_SNIPPET = """
+import time
+start = time.perf_counter()
+from config import load_entity_lists
+load_entity_lists()
+print(time.perf_counter() - start)
+"""
+
+CACHE_SNIPPET = """
+import time
+start = time.perf_counter()
+from entity_cache import get_entity_lists
+get_entity_lists()
+print(time.perf_counter() - start)
+"""
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start import time")
+    parser.add_argument("--runs", type=int, default=10, help="Fresh interpreters per measurement")
+    args = parser.parse_args()
+
+    # Warm the binary cache once so the cache measurement reflects a hit
+    time_in_subprocess(CACHE_SNIPPET, 1)
+
+    print("=" * 50)
+    print("⏱️  COLD-START BENCHMARK")
+    print("=" * 50)
+    report("import movie_db", time_in_subprocess(IMPORT_SNIPPET, args.runs))
+    report("entity lists from JSON", time_in_subprocess(JSON_SNIPPET, args.runs))
+    report("entity lists from binary cache", time_in_subprocess(CACHE_SNIPPET, args.runs))
+
+if __name__ == "__main__":
+    main()
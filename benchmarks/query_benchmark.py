@@ -0,0 +1,115 @@
+"""
+Before/after benchmark for the typed-column and trigram-index migration.
+
+"Before" always runs with index scans disabled for the transaction and "after"
+with indexes available. The typed-column cases also change the query shape
+(TEXT casts via NULLIF before, typed columns after); the substring cases run
+identical SQL and only compare the trigram indexes on versus off. Timings are
+the server-side execution times reported by EXPLAIN ANALYZE.
+
+Run from the repository root after `python migrations.py`:
+    python -m benchmarks.query_benchmark --runs 5
+"""
+import json
+import asyncio
+import argparse
+import statistics
+from db_connector import connect_to_db
+
+SHAPE_AND_INDEX = "shape+index"
+INDEX_ONLY = "index on/off"
+
+# (name, comparison, before, after)
+BENCHMARK_QUERIES = [
+    (
+        "rating filter + sort",
+        SHAPE_AND_INDEX,
+        "SELECT m.title FROM movies m WHERE NULLIF(m.imdb_rating, 'N/A')::NUMERIC > 8 "
+        "ORDER BY NULLIF(m.imdb_rating, 'N/A')::NUMERIC DESC LIMIT 100",
+        "SELECT m.title FROM movies m WHERE m.imdb_rating_num > 8 "
+        "ORDER BY m.imdb_rating_num DESC LIMIT 100",
+    ),
+    (
+        "year range",
+        SHAPE_AND_INDEX,
+        "SELECT m.title FROM movies m WHERE NULLIF(m.year, 'N/A')::INTEGER BETWEEN 2015 AND 2020 LIMIT 100",
+        "SELECT m.title FROM movies m WHERE m.year_num BETWEEN 2015 AND 2020 LIMIT 100",
+    ),
+    (
+        "title substring",
+        INDEX_ONLY,
+        "SELECT m.title FROM movies m WHERE m.title LIKE '%love%' LIMIT 100",
+        "SELECT m.title FROM movies m WHERE m.title LIKE '%love%' LIMIT 100",
+    ),
+    (
+        "plot substring",
+        INDEX_ONLY,
+        "SELECT m.title FROM movies m WHERE m.plot LIKE '%bank robbery%' LIMIT 100",
+        "SELECT m.title FROM movies m WHERE m.plot LIKE '%bank robbery%' LIMIT 100",
+    ),
+    (
+        "actor substring + join",
+        INDEX_ONLY,
+        "SELECT m.title FROM movies m JOIN movie_actors ma ON ma.movie_id = m.id "
+        "JOIN actors a ON a.id = ma.actor_id WHERE a.name LIKE '%khan%' LIMIT 100",
+        "SELECT m.title FROM movies m JOIN movie_actors ma ON ma.movie_id = m.id "
+        "JOIN actors a ON a.id = ma.actor_id WHERE a.name LIKE '%khan%' LIMIT 100",
+    ),
+]
+
+async def execution_time_ms(connection, sql: str, use_indexes: bool) -> float:
+    """
+    Execute a query under EXPLAIN ANALYZE and return its execution time.
+
+    Args:
+        connection: asyncpg connection
+        sql: Query to time
+        use_indexes: Whether the planner may use index and bitmap scans
+
+    Returns:
+        Execution time in milliseconds
+    """
+    async with connection.transaction(readonly=True):
+        if not use_indexes:
+            await connection.execute("SET LOCAL enable_indexscan = off")
+            await connection.execute("SET LOCAL enable_indexonlyscan = off")
+            await connection.execute("SET LOCAL enable_bitmapscan = off")
+        plan = await connection.fetchval(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}")
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Execution Time"]
+
+async def run_benchmark(runs: int) -> None:
+    pool = await connect_to_db()
+    if not pool:
+        return
+    try:
+        async with pool.acquire() as connection:
+            print("=" * 86)
+            print(f"{'query':<26}{'comparison':<14}{'before (ms)':>15}{'after (ms)':>15}{'speedup':>12}")
+            print("-" * 86)
+            for name, comparison, before_sql, after_sql in BENCHMARK_QUERIES:
+                # One untimed pass each to warm the buffer cache
+                await execution_time_ms(connection, before_sql, use_indexes=False)
+                await execution_time_ms(connection, after_sql, use_indexes=True)
+
+                before = statistics.median([
+                    await execution_time_ms(connection, before_sql, use_indexes=False) for _ in range(runs)
+                ])
+                after = statistics.median([
+                    await execution_time_ms(connection, after_sql, use_indexes=True) for _ in range(runs)
+                ])
+                speedup = before / after if after > 0 else float("inf")
+                print(f"{name:<26}{comparison:<14}{before:>15.2f}{after:>15.2f}{speedup:>11.1f}x")
+            print("=" * 86)
+    finally:
+        await pool.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark generated query shapes before/after the index migration")
+    parser.add_argument("--runs", type=int, default=5, help="Timed runs per query (median is reported)")
+    args = parser.parse_args()
+    asyncio.run(run_benchmark(args.runs))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+from functools import lru_cache
+from config import GEMINI_API_KEY, GEMINI_BASE_URL, QDRANT_URL
+
+@lru_cache(maxsize=None)
+def get_genai_client():
+    """
+    Return the shared Google Generative AI client, creating it on first use.
+
+    Returns:
+        genai.Client instance
+    """
+    from google import genai
+    from google.genai import types
+    http_options = types.HttpOptions(base_url=GEMINI_BASE_URL) if GEMINI_BASE_URL else None
+    return genai.Client(api_key=GEMINI_API_KEY, http_options=http_options)
+
+@lru_cache(maxsize=None)
+def get_qdrant_client():
+    """
+    Return the shared Qdrant client, creating it on first use.
+
+    Returns:
+        QdrantClient instance
+    """
+    from qdrant_client import QdrantClient
+    return QdrantClient(QDRANT_URL)
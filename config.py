@@ -7,6 +7,7 @@ load_dotenv()
 
 # API keys
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL")  # Optional API endpoint override, e.g. a local stub server
 
 # Database configuration
 DB_CONFIG = {
@@ -16,24 +17,105 @@ DB_CONFIG = {
     "password": "password",  # Replace with your actual password
     "database": "movie_mania" # Replace with your actual db name
 }
+DB_POOL_MIN_SIZE = 1
+DB_POOL_MAX_SIZE = 10
+
+# LLM models
+PRIMARY_MODEL = "gemini-2.5-flash-preview-04-17"
+FAST_MODEL = "gemini-2.0-flash"
+
+# Per-turn latency budget (seconds) and how it is split across stages
+TURN_LATENCY_BUDGET_S = 45.0
+STAGE_BUDGET_SHARES = {
+    "extraction": 0.15,
+    "sql_generation": 0.35,
+    "validation": 0.25,
+    "final_answer": 0.25,
+}
+HEDGE_DELAY_S = 8.0  # Send a duplicate request after this many seconds; None disables hedging
+FALLBACK_BUDGET_FRACTION = 0.35  # Switch SQL generation/validation to FAST_MODEL below this share of the budget
+
+# Context caching of the static system instructions (and optionally the early conversation)
+PROMPT_CACHE_ENABLED = True
+PROMPT_CACHE_TTL_S = 3600
+PROMPT_CACHE_REFRESH_MARGIN_S = 300  # Extend a cache's TTL when less than this is left
+PROMPT_CACHE_MIN_TOKENS = 1024  # Model minimum for cached content; smaller prefixes are sent inline
+PROMPT_CACHE_CREATE_TIMEOUT_S = 3.0  # Stop waiting for cache creation and send the prompt inline
+PROMPT_CACHE_RETRY_AFTER_S = 600  # Cool-down after a failed cache creation
+PROMPT_CACHE_HISTORY_STEP = 0  # Also cache history in blocks of this many messages; 0 caches instructions only
+
+# movie_search materialized view maintenance
+MOVIE_SEARCH_AUTO_REFRESH = True  # Run the change listener inside the chatbot and batch processes
+MOVIE_SEARCH_REFRESH_DEBOUNCE_S = 5.0
+
+# Guard rails for generated SQL
+SQL_ROW_LIMIT = 100  # LIMIT injected into (or capped on) every generated query
+SQL_MAX_PLAN_COST = 500000  # Reject plans whose estimated total cost is higher
+SQL_MAX_PLAN_ROWS = 5000000  # Reject plans with a larger intermediate row estimate
+SQL_STATEMENT_TIMEOUT_MS = 10000
+SQL_GUARD_MAX_RETRIES = 1  # Regenerate SQL this many times when queries are rejected
+
+# Vector store configuration
+QDRANT_URL = "http://localhost:6333/dashboard"
+RAG_COLLECTION_NAME = "rag_movies"
+
+# Embedding server (Ollama) configuration
+OLLAMA_URL = "http://localhost:11434"
+EMBEDDING_MODEL = "mxbai-embed-large:latest"
+EMBEDDING_DIM = 1024
+EMBEDDING_TIMEOUT_S = 3.0  # Hybrid search falls back to keyword results past this
+
+# RAG retrieval
+RAG_SEARCH_MODE = "hybrid"  # "hybrid" (full-text + vector with rank fusion) or "vector"
+RAG_RESULT_LIMIT = 10
+RRF_K = 60  # Reciprocal rank fusion damping constant
+RAG_KEYWORD_MAX_TERMS = 3  # Prompts this short try full-text search alone first
+RAG_KEYWORD_MIN_HITS = 5  # ...and skip the embedding if it finds at least this many movies
+RAG_FUSED_DOC_LIMIT = 12  # Documents sent to the final answer after cross-prompt fusion
+RAG_MMR_LAMBDA = 0.7  # Relevance vs diversity for the MMR cut; None disables it
+SPECULATIVE_RAG = True  # Prefetch similarity searches for known titles while SQL runs
+
+# Entity list sources and their compiled binary cache
+MOVIES_LIST_PATH = 'backend/data/movies_list.json'
+ACTORS_LIST_PATH = 'backend/data/actors_list.json'
+ALIASES_PATH = 'backend/data/aliases.json'
+ENTITY_CACHE_PATH = 'backend/data/entity_lists.bin'
+ENTITY_RELOAD_CHECK_S = 30  # How often to look for updated entity sources on disk
+ENTITY_REFRESH_INTERVAL_S = 0  # Regenerate entity lists from the database this often; 0 disables
 
 # Load movie and actor lists
 def load_entity_lists():
     movies_list = []
     actors_list = []
     
-    if os.path.exists('backend/data/movies_list.json'):
-        with open('backend/data/movies_list.json', 'r', encoding='utf-8') as f:
+    if os.path.exists(MOVIES_LIST_PATH):
+        with open(MOVIES_LIST_PATH, 'r', encoding='utf-8') as f:
             movies_list = json.load(f)
     else:
         print("Warning: movies_list.json not found. Using empty list.")
 
-    if os.path.exists('backend/data/actors_list.json'):
-        with open('backend/data/actors_list.json', 'r', encoding='utf-8') as f:
+    if os.path.exists(ACTORS_LIST_PATH):
+        with open(ACTORS_LIST_PATH, 'r', encoding='utf-8') as f:
             actors_list = json.load(f)
     else:
         print("Warning: actors_list.json not found. Using empty list.")
         
     return movies_list, actors_list
 
-MOVIES_LIST, ACTORS_LIST = load_entity_lists()
+# Load nickname aliases ({"actors": {alias: name}, "movies": {alias: title}})
+def load_entity_aliases():
+    if os.path.exists(ALIASES_PATH):
+        with open(ALIASES_PATH, 'r', encoding='utf-8') as f:
+            aliases = json.load(f)
+        return aliases.get("actors", {}), aliases.get("movies", {})
+    return {}, {}
+
+def __getattr__(name):
+    """
+    Resolve MOVIES_LIST / ACTORS_LIST lazily so importing config stays cheap.
+    """
+    if name in ("MOVIES_LIST", "ACTORS_LIST"):
+        from entity_cache import get_entity_lists
+        entity_lists = get_entity_lists()
+        return entity_lists.movies if name == "MOVIES_LIST" else entity_lists.actors
+    raise AttributeError(f"module 'config' has no attribute '{name}'")
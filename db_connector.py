@@ -1,18 +1,39 @@
 import asyncio
 import asyncpg
 import re
-from config import DB_CONFIG
+from typing import List, Optional
+from config import DB_CONFIG, DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, SQL_ROW_LIMIT
+from sql_guard import SQLGuardError, guarded_fetch
 
-async def connect_to_db():
+async def connect_to_db(min_size: int = DB_POOL_MIN_SIZE, max_size: int = DB_POOL_MAX_SIZE):
     """Create a database connection pool"""
     try:
-        conn_pool = await asyncpg.create_pool(**DB_CONFIG)
+        conn_pool = await asyncpg.create_pool(**DB_CONFIG, min_size=min_size, max_size=max_size)
         print("📊 Database connection established")
         return conn_pool
     except Exception as e:
         print(f"❌ Database connection failed: {str(e)}")
         return None
 
+_shared_pool = None
+_shared_pool_lock = asyncio.Lock()
+
+async def get_db_pool(**pool_options):
+    """Return the process-wide connection pool, creating it on first use (with pool_options)"""
+    global _shared_pool
+    if _shared_pool is None:
+        async with _shared_pool_lock:
+            if _shared_pool is None:
+                _shared_pool = await connect_to_db(**pool_options)
+    return _shared_pool
+
+async def close_db_pool():
+    """Close the process-wide connection pool if it was created"""
+    global _shared_pool
+    if _shared_pool is not None:
+        await _shared_pool.close()
+        _shared_pool = None
+
 def clean_sql_query(sql_text):
     """Clean up SQL query by removing markdown code blocks if present"""
     if "```" in sql_text:
@@ -23,8 +44,19 @@ def clean_sql_query(sql_text):
     
     return sql_text.strip()
 
-async def execute_query(pool, sql_object):
-    """Execute SQL queries and return the results"""
+async def execute_query(pool, sql_object, rejections: Optional[List[str]] = None):
+    """
+    Execute SQL queries through the guard and return the results.
+    
+    Args:
+        pool: Database connection pool
+        sql_object: SQL response with the queries to run
+        rejections: Optional list that collects why queries were rejected or failed,
+            to be fed back to the SQL generator
+        
+    Returns:
+        List of {query index: rows} entries
+    """
     result_data = []
     queries_list = sql_object.get('sql_queries', [])
 
@@ -33,23 +65,23 @@ async def execute_query(pool, sql_object):
         try:
             print(f"🔍 Executing SQL query #{i+1}: {query[:100]}...")
             async with pool.acquire() as connection:
-                # Determine if the query is a SELECT query or something else
-                is_select = query.strip().lower().startswith('select')
+                # Validate, bound and cost-check the query, then run it read-only
+                rows = await guarded_fetch(connection, query)
                 
-                if is_select:
-                    # For SELECT queries, fetch all rows
-                    rows = await connection.fetch(query)
-                    
-                    # Convert rows to list of dictionaries
-                    result = [dict(row) for row in rows]
-                    result_data.append({i: result[:100]})
-                    print(f"✅ Query #{i+1} returned {len(result)} rows")
-                else:
-                    result_data.append({i: ["Nothing to show"]})
-                    print(f"⚠️ Query #{i+1} is not a SELECT query")
+                # Convert rows to list of dictionaries
+                result = [dict(row) for row in rows]
+                result_data.append({i: result[:SQL_ROW_LIMIT]})
+                print(f"✅ Query #{i+1} returned {len(result)} rows")
                     
+        except SQLGuardError as e:
+            print(f"🛡️ Query #{i+1} rejected: {str(e)}")
+            result_data.append({i: ["Nothing to show"]})
+            if rejections is not None:
+                rejections.append(f"Query #{i+1} rejected: {str(e)}")
         except Exception as e:
             print(f"❌ Error executing query #{i+1}: {str(e)}")
             result_data.append({i: ["Nothing to show"]})
+            if rejections is not None:
+                rejections.append(f"Query #{i+1} failed: {str(e)}")
     
     return result_data
\ No newline at end of file
@@ -0,0 +1,250 @@
+import os
+import json
+import mmap
+import struct
+import time
+import threading
+from typing import List, Dict, FrozenSet, NamedTuple, Optional
+from config import (MOVIES_LIST_PATH, ACTORS_LIST_PATH, ALIASES_PATH, ENTITY_CACHE_PATH,
+                    ENTITY_RELOAD_CHECK_S, load_entity_lists, load_entity_aliases)
+
+# Binary layout: magic | fingerprint | sections (name, count, NUL-joined UTF-8 blob)
+CACHE_MAGIC = b"MMENT\x01\x00\x00"
+_HEADER_LEN = struct.Struct("<I")
+_SECTION_NAME = struct.Struct("<H")
+_SECTION_SIZES = struct.Struct("<IQ")
+
+ENTITY_SOURCES = [MOVIES_LIST_PATH, ACTORS_LIST_PATH, ALIASES_PATH]
+
+class EntityLists(NamedTuple):
+    movies: List[str]
+    actors: List[str]
+    movie_keys: FrozenSet[str]
+    actor_aliases: Dict[str, str]
+    movie_aliases: Dict[str, str]
+    # Fuzzy-match choices (names plus aliases) and the canonical name for each
+    actor_choices: List[str]
+    actor_canonical: List[str]
+    movie_choices: List[str]
+    movie_canonical: List[str]
+
+_entity_lists: Optional[EntityLists] = None
+_entity_lists_fingerprint: Optional[bytes] = None
+_entity_lists_checked_at = 0.0
+_entity_lists_lock = threading.Lock()
+
+def normalize_entity(name: str) -> str:
+    """Normalise a title or name for exact lookups."""
+    return name.strip().lower()
+
+def _source_fingerprint(paths: List[str]) -> bytes:
+    """
+    Identify the current version of the JSON sources without reading them.
+
+    Args:
+        paths: Source file paths
+
+    Returns:
+        Encoded (path, mtime, size) tuples; missing files are recorded as such
+    """
+    entries = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            entries.append([path, stat.st_mtime_ns, stat.st_size])
+        except OSError:
+            entries.append([path, None, None])
+    return json.dumps(entries).encode("utf-8")
+
+def _build_sections(movies: List[str], actors: List[str],
+                    actor_aliases: Dict[str, str], movie_aliases: Dict[str, str]) -> Dict[str, List[str]]:
+    """Build the raw lists plus the derived structures stored in the cache."""
+    movie_keys = sorted({normalize_entity(movie) for movie in movies if movie})
+    actor_aliases = {normalize_entity(alias): name for alias, name in actor_aliases.items() if alias}
+    movie_aliases = {normalize_entity(alias): title for alias, title in movie_aliases.items() if alias}
+    return {
+        "movies": movies,
+        "actors": actors,
+        "movie_keys": movie_keys,
+        "actor_alias_keys": list(actor_aliases),
+        "actor_alias_values": list(actor_aliases.values()),
+        "movie_alias_keys": list(movie_aliases),
+        "movie_alias_values": list(movie_aliases.values()),
+    }
+
+def _entity_lists_from_sections(sections: Dict[str, List[str]]) -> EntityLists:
+    """Assemble an EntityLists snapshot, including the fuzzy-match choice lists."""
+    movies = sections.get("movies", [])
+    actors = sections.get("actors", [])
+    actor_aliases = dict(zip(sections.get("actor_alias_keys", []), sections.get("actor_alias_values", [])))
+    movie_aliases = dict(zip(sections.get("movie_alias_keys", []), sections.get("movie_alias_values", [])))
+    return EntityLists(
+        movies=movies,
+        actors=actors,
+        movie_keys=frozenset(sections.get("movie_keys", [])),
+        actor_aliases=actor_aliases,
+        movie_aliases=movie_aliases,
+        actor_choices=actors + list(actor_aliases),
+        actor_canonical=actors + list(actor_aliases.values()),
+        movie_choices=movies + list(movie_aliases),
+        movie_canonical=movies + list(movie_aliases.values()),
+    )
+
+def write_entity_cache(path: str, fingerprint: bytes, sections: Dict[str, List[str]]) -> None:
+    """
+    Write the compiled entity cache atomically.
+
+    Args:
+        path: Destination cache file
+        fingerprint: Fingerprint of the sources the cache was built from
+        sections: Named string lists to store
+    """
+    chunks = [CACHE_MAGIC, _HEADER_LEN.pack(len(fingerprint)), fingerprint,
+              _HEADER_LEN.pack(len(sections))]
+    for name, values in sections.items():
+        name_bytes = name.encode("utf-8")
+        blob = "\0".join(values).encode("utf-8")
+        chunks.append(_SECTION_NAME.pack(len(name_bytes)))
+        chunks.append(name_bytes)
+        chunks.append(_SECTION_SIZES.pack(len(values), len(blob)))
+        chunks.append(blob)
+
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(b"".join(chunks))
+    os.replace(tmp_path, path)
+
+def read_entity_cache(path: str, fingerprint: Optional[bytes] = None) -> Optional[Dict[str, List[str]]]:
+    """
+    Read the compiled entity cache through a memory map.
+
+    Every section is decoded into a Python list up front; the gain over the
+    JSON sources comes from skipping the rebuild of the derived keys and alias
+    maps, not from deferring the decode.
+
+    Args:
+        path: Cache file to read
+        fingerprint: Expected source fingerprint; a mismatch counts as a miss
+
+    Returns:
+        Named string lists, or None if the cache is missing, stale or corrupt
+    """
+    try:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm[:len(CACHE_MAGIC)] != CACHE_MAGIC:
+                return None
+            offset = len(CACHE_MAGIC)
+            (fingerprint_len,) = _HEADER_LEN.unpack_from(mm, offset)
+            offset += _HEADER_LEN.size
+            if fingerprint is not None and mm[offset:offset + fingerprint_len] != fingerprint:
+                return None
+            offset += fingerprint_len
+            (section_count,) = _HEADER_LEN.unpack_from(mm, offset)
+            offset += _HEADER_LEN.size
+
+            sections = {}
+            for _ in range(section_count):
+                (name_len,) = _SECTION_NAME.unpack_from(mm, offset)
+                offset += _SECTION_NAME.size
+                name = mm[offset:offset + name_len].decode("utf-8")
+                offset += name_len
+                count, blob_len = _SECTION_SIZES.unpack_from(mm, offset)
+                offset += _SECTION_SIZES.size
+                if offset + blob_len > len(mm):
+                    return None
+                blob = mm[offset:offset + blob_len].decode("utf-8")
+                offset += blob_len
+                values = blob.split("\0") if count else []
+                if len(values) != count:
+                    return None
+                sections[name] = values
+            # Anything left over means the file was not written by write_entity_cache
+            return sections if offset == len(mm) else None
+    except (OSError, ValueError, struct.error, UnicodeDecodeError):
+        return None
+
+def _load_entity_lists(fingerprint: bytes) -> EntityLists:
+    """Load entity lists from the binary cache, rebuilding it if the JSON changed."""
+    sections = read_entity_cache(ENTITY_CACHE_PATH, fingerprint)
+
+    if sections is None:
+        print("🔄 Building entity list cache from JSON sources")
+        movies_list, actors_list = load_entity_lists()
+        actor_aliases, movie_aliases = load_entity_aliases()
+        sections = _build_sections(movies_list, actors_list, actor_aliases, movie_aliases)
+        if any(os.path.exists(path) for path in ENTITY_SOURCES):
+            try:
+                write_entity_cache(ENTITY_CACHE_PATH, fingerprint, sections)
+            except OSError as e:
+                print(f"⚠️ Could not write entity cache: {str(e)}")
+
+    return _entity_lists_from_sections(sections)
+
+def _swap(entity_lists: EntityLists, fingerprint: bytes) -> None:
+    """Publish a new snapshot; callers already holding the old one keep using it."""
+    global _entity_lists, _entity_lists_fingerprint, _entity_lists_checked_at
+    _entity_lists, _entity_lists_fingerprint = entity_lists, fingerprint
+    _entity_lists_checked_at = time.monotonic()
+
+def get_entity_lists() -> EntityLists:
+    """
+    Return the current movie and actor lists, loading them on first use and
+    reloading them when the sources on disk have changed.
+
+    Callers should fetch the snapshot once per request and use it throughout,
+    so a concurrent refresh never mixes old and new data within one request.
+
+    Returns:
+        EntityLists snapshot with raw lists and derived lookup structures
+    """
+    global _entity_lists_checked_at
+    if _entity_lists is not None and time.monotonic() - _entity_lists_checked_at < ENTITY_RELOAD_CHECK_S:
+        return _entity_lists
+
+    with _entity_lists_lock:
+        if _entity_lists is not None and time.monotonic() - _entity_lists_checked_at < ENTITY_RELOAD_CHECK_S:
+            return _entity_lists
+        fingerprint = _source_fingerprint(ENTITY_SOURCES)
+        if _entity_lists is not None and fingerprint == _entity_lists_fingerprint:
+            _entity_lists_checked_at = time.monotonic()
+            return _entity_lists
+        if _entity_lists is not None:
+            print("🔄 Entity sources changed on disk, reloading")
+        _swap(_load_entity_lists(fingerprint), fingerprint)
+        return _entity_lists
+
+def _write_json_atomic(path: str, data) -> None:
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def publish_entity_lists(movies: List[str], actors: List[str],
+                         actor_aliases: Dict[str, str], movie_aliases: Dict[str, str]) -> EntityLists:
+    """
+    Write new entity sources and cache to disk and hot-swap them in-process.
+
+    Other processes pick the change up through their periodic source check.
+
+    Args:
+        movies: Movie titles
+        actors: Actor names
+        actor_aliases: Actor nickname -> canonical name
+        movie_aliases: Movie alias -> canonical title
+
+    Returns:
+        The newly published EntityLists snapshot
+    """
+    sections = _build_sections(movies, actors, actor_aliases, movie_aliases)
+    entity_lists = _entity_lists_from_sections(sections)
+
+    with _entity_lists_lock:
+        os.makedirs(os.path.dirname(MOVIES_LIST_PATH), exist_ok=True)
+        _write_json_atomic(MOVIES_LIST_PATH, movies)
+        _write_json_atomic(ACTORS_LIST_PATH, actors)
+        _write_json_atomic(ALIASES_PATH, {"actors": actor_aliases, "movies": movie_aliases})
+        fingerprint = _source_fingerprint(ENTITY_SOURCES)
+        write_entity_cache(ENTITY_CACHE_PATH, fingerprint, sections)
+        _swap(entity_lists, fingerprint)
+
+    return entity_lists
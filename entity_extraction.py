@@ -1,16 +1,15 @@
-from google import genai
-from config import GEMINI_API_KEY
+from typing import Optional
+from config import FAST_MODEL
+from llm_calls import TurnBudget, generate_content, mark_degraded
 from models import MovieInfo
 
-# Initialize Google Generative AI client
-client = genai.Client(api_key=GEMINI_API_KEY)
-
-def extract_movie_info(user_query):
+async def extract_movie_info(user_query, budget: Optional[TurnBudget] = None):
     """
     Extract structured movie information from a user query using Gemini.
     
     Args:
         user_query: The natural language query from the user
+        budget: Optional latency budget for the current turn
         
     Returns:
         MovieInfo object containing extracted entities and task
@@ -44,14 +43,21 @@ If any field is missing or not clearly stated in the query, return an empty list
 """
     
     # Generate response from Gemini with schema
-    response = client.models.generate_content(
-        model="gemini-2.0-flash",
-        contents=prompt,
-        config={
-            "response_mime_type": "application/json",
-            "response_schema": MovieInfo,
-        },
-    )
+    try:
+        response = await generate_content(
+            "extraction",
+            model=FAST_MODEL,
+            contents=prompt,
+            config={
+                "response_mime_type": "application/json",
+                "response_schema": MovieInfo,
+            },
+            budget=budget,
+        )
+    except Exception as e:
+        print(f"❌ Error extracting movie information: {str(e)}")
+        mark_degraded(budget, "extraction", e)
+        return MovieInfo()
     
     # Return the parsed Pydantic object
     extracted_info = response.parsed
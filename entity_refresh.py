@@ -0,0 +1,111 @@
+"""
+Regenerate the movie/actor dictionaries used for fuzzy matching from the
+database and hot-swap them into the running process.
+
+Usage:
+    python entity_refresh.py          # refresh once and write the JSON sources + cache
+"""
+import asyncio
+import asyncpg
+from typing import Dict, Tuple
+from config import ENTITY_REFRESH_INTERVAL_S
+from db_connector import connect_to_db
+from entity_cache import EntityLists, publish_entity_lists
+
+# Nicknames and alternate titles, e.g. ('king khan', 'actor', <id of shah rukh khan>)
+ALIAS_TABLE_DDL = """
+CREATE TABLE IF NOT EXISTS entity_aliases (
+    alias TEXT NOT NULL,
+    entity_type TEXT NOT NULL CHECK (entity_type IN ('actor', 'movie')),
+    entity_id INTEGER NOT NULL,
+    PRIMARY KEY (alias, entity_type)
+)
+"""
+
+ALIASES_QUERY = """
+SELECT ea.alias, ea.entity_type, COALESCE(a.name, m.title) AS canonical
+FROM entity_aliases ea
+LEFT JOIN actors a ON ea.entity_type = 'actor' AND a.id = ea.entity_id
+LEFT JOIN movies m ON ea.entity_type = 'movie' AND m.id = ea.entity_id
+"""
+
+async def fetch_entity_aliases(connection) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """
+    Read actor and movie aliases from the alias table.
+
+    Returns:
+        (actor_aliases, movie_aliases) mapping alias -> canonical name
+    """
+    actor_aliases, movie_aliases = {}, {}
+    try:
+        rows = await connection.fetch(ALIASES_QUERY)
+    except asyncpg.exceptions.UndefinedTableError:
+        print("⚠️ entity_aliases table not found, continuing without aliases")
+        return actor_aliases, movie_aliases
+
+    for row in rows:
+        if not row["canonical"]:
+            continue
+        target = actor_aliases if row["entity_type"] == "actor" else movie_aliases
+        target[row["alias"]] = row["canonical"]
+    return actor_aliases, movie_aliases
+
+async def refresh_entity_lists(pool) -> EntityLists:
+    """
+    Regenerate entity lists from the movies, actors and alias tables and
+    swap them in atomically. Requests already running keep the snapshot
+    they started with.
+
+    Args:
+        pool: Database connection pool
+
+    Returns:
+        The new EntityLists snapshot
+    """
+    async with pool.acquire() as connection:
+        movies = [row["title"] for row in await connection.fetch(
+            "SELECT DISTINCT title FROM movies WHERE title IS NOT NULL ORDER BY title")]
+        actors = [row["name"] for row in await connection.fetch(
+            "SELECT DISTINCT name FROM actors WHERE name IS NOT NULL ORDER BY name")]
+        actor_aliases, movie_aliases = await fetch_entity_aliases(connection)
+
+    # File writes and cache compilation run off the event loop
+    entity_lists = await asyncio.to_thread(
+        publish_entity_lists, movies, actors, actor_aliases, movie_aliases
+    )
+    print(f"✅ Entity lists refreshed: {len(movies)} movies, {len(actors)} actors, "
+          f"{len(actor_aliases) + len(movie_aliases)} aliases")
+    return entity_lists
+
+async def entity_refresh_loop(interval: float = ENTITY_REFRESH_INTERVAL_S) -> None:
+    """
+    Periodically refresh the entity lists in the background.
+
+    Args:
+        interval: Seconds between refreshes
+    """
+    while True:
+        await asyncio.sleep(interval)
+        pool = await connect_to_db()
+        if not pool:
+            continue
+        try:
+            await refresh_entity_lists(pool)
+        except Exception as e:
+            print(f"❌ Entity list refresh failed: {str(e)}")
+        finally:
+            await pool.close()
+
+async def main():
+    pool = await connect_to_db()
+    if not pool:
+        return
+    try:
+        async with pool.acquire() as connection:
+            await connection.execute(ALIAS_TABLE_DDL)
+        await refresh_entity_lists(pool)
+    finally:
+        await pool.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,13 +1,14 @@
 from typing import List, Tuple
 from rapidfuzz import process, fuzz
-from config import MOVIES_LIST, ACTORS_LIST
+from entity_cache import get_entity_lists, normalize_entity
 
 def fuzzy_match_entities(user_actors: List[str] = [], 
                          user_movies: List[str] = [], 
                          threshold: int = 70) -> Tuple[List[str], List[str]]:
     """
     Perform fuzzy matching against known actor and movie lists to correct
-    misspelled or abbreviated names.
+    misspelled or abbreviated names. Known aliases (e.g. "King Khan") resolve
+    to their canonical name.
     
     Args:
         user_actors: List of actor names provided by the user
@@ -19,6 +20,8 @@ def fuzzy_match_entities(user_actors: List[str] = [],
     """
     print(f"🔄 Performing fuzzy matching on {len(user_movies)} movies and {len(user_actors)} actors")
     
+    entity_lists = get_entity_lists()
+    
     # Initialize output lists
     corrected_actors = []
     corrected_movies = []
@@ -29,17 +32,25 @@ def fuzzy_match_entities(user_actors: List[str] = [],
         if not user_actor.strip():
             corrected_actors.append("")
             continue
+        
+        # Exact alias hit
+        alias_match = entity_lists.actor_aliases.get(normalize_entity(user_actor))
+        if alias_match:
+            print(f"  Actor alias: '{user_actor}' → '{alias_match}'")
+            corrected_actors.append(alias_match)
+            continue
             
-        # Find the best match in actor_list
+        # Find the best match among names and aliases
         match_result = process.extractOne(
             user_actor, 
-            ACTORS_LIST, 
+            entity_lists.actor_choices, 
             scorer=fuzz.WRatio
         )
 
         if match_result and match_result[1] >= threshold:
-            print(f"  Actor match: '{user_actor}' → '{match_result[0]}' (score: {match_result[1]})")
-            corrected_actors.append(match_result[0])
+            canonical = entity_lists.actor_canonical[match_result[2]]
+            print(f"  Actor match: '{user_actor}' → '{canonical}' (score: {match_result[1]})")
+            corrected_actors.append(canonical)
         else:
             print(f"  No good match found for actor: '{user_actor}'")
             corrected_actors.append(user_actor)
@@ -50,17 +61,25 @@ def fuzzy_match_entities(user_actors: List[str] = [],
         if not user_movie.strip():
             corrected_movies.append("")
             continue
+        
+        # Exact alias hit
+        alias_match = entity_lists.movie_aliases.get(normalize_entity(user_movie))
+        if alias_match:
+            print(f"  Movie alias: '{user_movie}' → '{alias_match}'")
+            corrected_movies.append(alias_match)
+            continue
             
-        # Find the best match in movies_list
+        # Find the best match among names and aliases
         match_result = process.extractOne(
             user_movie, 
-            MOVIES_LIST, 
+            entity_lists.movie_choices, 
             scorer=fuzz.WRatio
         )
 
         if match_result and match_result[1] >= threshold:
-            print(f"  Movie match: '{user_movie}' → '{match_result[0]}' (score: {match_result[1]})")
-            corrected_movies.append(match_result[0])
+            canonical = entity_lists.movie_canonical[match_result[2]]
+            print(f"  Movie match: '{user_movie}' → '{canonical}' (score: {match_result[1]})")
+            corrected_movies.append(canonical)
         else:
             print(f"  No good match found for movie: '{user_movie}'")
             corrected_movies.append(user_movie)
@@ -0,0 +1,277 @@
+"""
+Build or incrementally refresh the rag_movies Qdrant collection from Postgres.
+
+Each point uses the movie id as its id and stores two content hashes in its
+payload: one over the embedded plot text and one over the rest of the payload.
+Movies whose plot hash is unchanged are never re-embedded; if only the payload
+changed (new actor, rating update, ...) the payload is overwritten in place.
+Movies are read in id-ordered pages, each in its own short query, so no
+snapshot is held open while embeddings and upserts run.
+
+Points without a plot_hash were written before this job existed (under other
+ids); after a successful run they are deleted so searches never return the
+same movie twice.
+
+Usage:
+    python ingest_rag.py                 # incremental run
+    python ingest_rag.py --full          # re-embed everything
+    python ingest_rag.py --prune         # also delete points for removed movies
+"""
+import json
+import asyncio
+import argparse
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Tuple
+from qdrant_client.http import models
+from clients import get_qdrant_client
+from config import EMBEDDING_DIM
+from db_connector import connect_to_db
+from rag_search import COLLECTION_NAME, MOVIE_PAYLOAD_COLUMNS, build_movie_payload, get_embeddings
+
+MOVIES_QUERY = """
+SELECT """ + MOVIE_PAYLOAD_COLUMNS + """
+FROM movies m
+WHERE m.id > $1
+ORDER BY m.id
+LIMIT $2
+"""
+
+# Payload fields search_rag_movies filters on
+INDEXED_PAYLOAD_FIELDS = ["Title", "Genre", "Year", "Actors", "ImdbRating"]
+
+def embedding_text(payload: Dict[str, Any]) -> str:
+    """Text that gets embedded for a movie: its plot, or the title when the plot is missing."""
+    plot = (payload.get("Plot") or "").strip()
+    if not plot or plot == "n/a":
+        return payload["Title"]
+    return plot
+
+def content_hashes(payload: Dict[str, Any], text: str) -> Tuple[str, str]:
+    """
+    Hash the embedded text and the payload separately.
+
+    Returns:
+        (plot_hash, payload_hash)
+    """
+    plot_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    payload_hash = hashlib.sha256(
+        json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    ).hexdigest()
+    return plot_hash, payload_hash
+
+def ensure_collection(client) -> None:
+    """Create the collection and any missing payload indexes."""
+    if not client.collection_exists(COLLECTION_NAME):
+        print(f"🧱 Creating collection '{COLLECTION_NAME}'")
+        client.create_collection(
+            collection_name=COLLECTION_NAME,
+            vectors_config=models.VectorParams(size=EMBEDDING_DIM, distance=models.Distance.COSINE),
+        )
+    indexed = client.get_collection(COLLECTION_NAME).payload_schema or {}
+    for field in INDEXED_PAYLOAD_FIELDS:
+        if field in indexed:
+            continue
+        print(f"🧱 Creating payload index on '{field}'")
+        client.create_payload_index(
+            collection_name=COLLECTION_NAME,
+            field_name=field,
+            field_schema=models.PayloadSchemaType.KEYWORD,
+            wait=True,
+        )
+
+def load_existing_hashes(client, page_size: int = 2048) -> Dict[Any, Tuple[str, str]]:
+    """
+    Read the content hashes of every point already in the collection.
+
+    Returns:
+        Mapping of point id -> (plot_hash, payload_hash)
+    """
+    existing = {}
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=COLLECTION_NAME,
+            limit=page_size,
+            offset=offset,
+            with_payload=["plot_hash", "payload_hash"],
+            with_vectors=False,
+        )
+        for point in points:
+            payload = point.payload or {}
+            existing[point.id] = (payload.get("plot_hash"), payload.get("payload_hash"))
+        if offset is None:
+            return existing
+
+def embed_in_parallel(texts: List[str], batch_size: int, executor: ThreadPoolExecutor) -> List[List[float]]:
+    """
+    Embed texts as concurrent batches.
+
+    Args:
+        texts: Texts to embed
+        batch_size: Texts per embedding request
+        executor: Thread pool running the requests
+
+    Returns:
+        Embedding vectors in input order
+    """
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    vectors = []
+    for batch_vectors in executor.map(get_embeddings, batches):
+        vectors.extend(batch_vectors)
+    return vectors
+
+def upsert_points(client, points: List[models.PointStruct], batch_size: int) -> None:
+    """Upsert points in large batches."""
+    for i in range(0, len(points), batch_size):
+        client.upsert(collection_name=COLLECTION_NAME, points=points[i:i + batch_size], wait=True)
+
+def delete_points(client, point_ids: List[Any], batch_size: int) -> None:
+    """Delete points by id in batches."""
+    for i in range(0, len(point_ids), batch_size):
+        client.delete(
+            collection_name=COLLECTION_NAME,
+            points_selector=models.PointIdsList(points=point_ids[i:i + batch_size]),
+            wait=True,
+        )
+
+def overwrite_payloads(client, payloads: Dict[int, Dict[str, Any]], batch_size: int) -> None:
+    """Replace payloads of points whose vectors are still valid."""
+    operations = [
+        models.OverwritePayloadOperation(
+            overwrite_payload=models.SetPayload(payload=payload, points=[point_id])
+        )
+        for point_id, payload in payloads.items()
+    ]
+    for i in range(0, len(operations), batch_size):
+        client.batch_update_points(
+            collection_name=COLLECTION_NAME,
+            update_operations=operations[i:i + batch_size],
+            wait=True,
+        )
+
+async def ingest(full: bool = False,
+                 prune: bool = False,
+                 chunk_size: int = 2000,
+                 embed_batch_size: int = 64,
+                 upsert_batch_size: int = 512,
+                 workers: int = 4) -> Dict[str, int]:
+    """
+    Sync the rag_movies collection with the movies tables.
+
+    Args:
+        full: Ignore stored hashes and re-embed every movie
+        prune: Delete points whose movie no longer exists
+        chunk_size: Movies read from Postgres per round
+        embed_batch_size: Texts per embedding request
+        upsert_batch_size: Points per Qdrant upsert
+        workers: Concurrent embedding requests
+
+    Returns:
+        Counts of embedded, payload-only, unchanged, legacy-removed and pruned movies
+    """
+    stats = {"embedded": 0, "payload_only": 0, "unchanged": 0, "legacy_removed": 0, "pruned": 0}
+    client = get_qdrant_client()
+    ensure_collection(client)
+    existing = load_existing_hashes(client)
+    legacy_ids = [point_id for point_id, (plot_hash, _) in existing.items() if plot_hash is None]
+    print(f"📦 {len(existing)} points already in '{COLLECTION_NAME}' ({len(legacy_ids)} from before incremental ingestion)")
+    existing_hashes = {} if full else existing
+
+    pool = await connect_to_db()
+    if not pool:
+        return stats
+
+    seen_ids = set()
+    loop = asyncio.get_running_loop()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            last_id = -1  # Movie ids are positive serials
+            while True:
+                # Keyset pagination: one short statement per page instead of a long-lived cursor
+                rows = await pool.fetch(MOVIES_QUERY, last_id, chunk_size)
+                if not rows:
+                    break
+                last_id = rows[-1]["id"]
+
+                to_embed = []
+                payload_updates = {}
+                for row in rows:
+                    seen_ids.add(row["id"])
+                    payload = build_movie_payload(row)
+                    text = embedding_text(payload)
+                    plot_hash, payload_hash = content_hashes(payload, text)
+                    payload.update({"plot_hash": plot_hash, "payload_hash": payload_hash})
+
+                    old_plot_hash, old_payload_hash = existing_hashes.get(row["id"], (None, None))
+                    if old_plot_hash != plot_hash:
+                        to_embed.append((row["id"], text, payload))
+                    elif old_payload_hash != payload_hash:
+                        payload_updates[row["id"]] = payload
+                    else:
+                        stats["unchanged"] += 1
+
+                if to_embed:
+                    texts = [text for _, text, _ in to_embed]
+                    vectors = await loop.run_in_executor(
+                        None, embed_in_parallel, texts, embed_batch_size, executor
+                    )
+                    points = [
+                        models.PointStruct(id=movie_id, vector=vector, payload=payload)
+                        for (movie_id, _, payload), vector in zip(to_embed, vectors)
+                    ]
+                    await loop.run_in_executor(None, upsert_points, client, points, upsert_batch_size)
+                    stats["embedded"] += len(points)
+
+                if payload_updates:
+                    await loop.run_in_executor(
+                        None, overwrite_payloads, client, payload_updates, upsert_batch_size
+                    )
+                    stats["payload_only"] += len(payload_updates)
+
+                print(f"✅ Processed {len(seen_ids)} movies "
+                      f"({stats['embedded']} embedded, {stats['payload_only']} payload-only)")
+    finally:
+        await pool.close()
+
+    # Every movie now has a hashed point under its own id, so the legacy copies can go
+    legacy_ids = [point_id for point_id in legacy_ids if point_id not in seen_ids]
+    if legacy_ids and seen_ids:
+        print(f"🧹 Removing {len(legacy_ids)} legacy points")
+        delete_points(client, legacy_ids, upsert_batch_size)
+        stats["legacy_removed"] = len(legacy_ids)
+
+    if prune:
+        stale_ids = [point_id for point_id, (plot_hash, _) in existing.items()
+                     if plot_hash is not None and point_id not in seen_ids]
+        delete_points(client, stale_ids, upsert_batch_size)
+        stats["pruned"] = len(stale_ids)
+
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest movies from Postgres into the rag_movies collection")
+    parser.add_argument("--full", action="store_true", help="Re-embed every movie, ignoring stored hashes")
+    parser.add_argument("--prune", action="store_true", help="Delete points for movies no longer in Postgres")
+    parser.add_argument("--chunk-size", type=int, default=2000, help="Movies read from Postgres per round")
+    parser.add_argument("--embed-batch-size", type=int, default=64, help="Texts per embedding request")
+    parser.add_argument("--upsert-batch-size", type=int, default=512, help="Points per Qdrant upsert")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent embedding requests")
+    args = parser.parse_args()
+
+    stats = asyncio.run(ingest(
+        full=args.full,
+        prune=args.prune,
+        chunk_size=args.chunk_size,
+        embed_batch_size=args.embed_batch_size,
+        upsert_batch_size=args.upsert_batch_size,
+        workers=args.workers,
+    ))
+    print("\n" + "=" * 50)
+    print("📊 INGESTION SUMMARY")
+    for key, value in stats.items():
+        print(f"  {key}: {value}")
+    print("=" * 50)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+import time
+import asyncio
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Any, List, Optional
+from clients import get_genai_client
+from prompt_cache import get_prompt_cache, is_cache_error
+from config import (TURN_LATENCY_BUDGET_S, STAGE_BUDGET_SHARES,
+                    HEDGE_DELAY_S, FALLBACK_BUDGET_FRACTION, PROMPT_CACHE_ENABLED)
+
+# How often each path fired, keyed by "<stage>.<event>"
+LLM_CALL_STATS = Counter()
+
+class TurnBudget:
+    """
+    Latency budget for a single conversation turn, split across pipeline stages.
+
+    Each stage gets a share of the time that is still left, proportional to its
+    weight among the stages that have not run yet, so time saved by a fast stage
+    rolls over to the later ones.
+    """
+
+    def __init__(self, total_seconds: float = TURN_LATENCY_BUDGET_S,
+                 stage_shares: Optional[Dict[str, float]] = None):
+        self.total_seconds = total_seconds
+        self.stage_shares = dict(stage_shares or STAGE_BUDGET_SHARES)
+        self.started_at = time.monotonic()
+        self.stage_timings: Dict[str, float] = {}
+        # Stages that fell back to a canned or partial result instead of failing the turn
+        self.degraded: List[str] = []
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def remaining(self) -> float:
+        return max(0.0, self.total_seconds - self.elapsed())
+
+    def stage_timeout(self, stage: str) -> float:
+        """
+        Deadline in seconds for a stage starting now.
+
+        Args:
+            stage: Stage name from STAGE_BUDGET_SHARES
+
+        Returns:
+            Seconds the stage may use
+        """
+        stages = list(self.stage_shares)
+        if stage not in stages:
+            return self.remaining()
+        pending_weight = sum(self.stage_shares[name] for name in stages[stages.index(stage):])
+        if pending_weight <= 0:
+            return self.remaining()
+        return self.remaining() * self.stage_shares[stage] / pending_weight
+
+    def nearly_exhausted(self) -> bool:
+        return self.remaining() <= self.total_seconds * FALLBACK_BUDGET_FRACTION
+
+    @contextmanager
+    def track(self, stage: str):
+        """Record the wall-clock time spent in a stage (accumulated across retries)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_timings[stage] = self.stage_timings.get(stage, 0.0) + time.perf_counter() - started
+
+def track_stage(budget: Optional[TurnBudget], stage: str):
+    """Time a stage on the given budget, or do nothing without one."""
+    return budget.track(stage) if budget is not None else nullcontext()
+
+def mark_degraded(budget: Optional[TurnBudget], stage: str, error: Any) -> None:
+    """Record that a stage swallowed an error and the turn continued with a fallback."""
+    if budget is not None:
+        budget.degraded.append(f"{stage}: {str(error)}")
+
+async def generate_content(stage: str,
+                           model: str,
+                           contents: Any,
+                           config: Any = None,
+                           budget: Optional[TurnBudget] = None,
+                           fallback_model: Optional[str] = None,
+                           hedge_delay: Optional[float] = HEDGE_DELAY_S,
+                           cache_prompt: bool = False):
+    """
+    Call Gemini with a per-stage deadline, an optional hedged second request
+    and a fallback to a faster model when the turn budget is nearly spent.
+    With cache_prompt the system instruction is served from a context cache.
+
+    Args:
+        stage: Pipeline stage name, used for the deadline and the stats
+        model: Model to use normally
+        contents: Prompt or conversation contents
+        config: GenerateContentConfig (or dict) for the call
+        budget: Turn budget; without one the call has no deadline
+        fallback_model: Faster model to switch to when the budget is nearly exhausted
+        hedge_delay: Seconds to wait before sending a duplicate request, None to disable
+        cache_prompt: Reference the system instruction through a context cache when possible
+
+    Returns:
+        The first successful GenerateContentResponse
+
+    Raises:
+        asyncio.TimeoutError: If no request finished within the stage deadline
+    """
+    LLM_CALL_STATS[f"{stage}.calls"] += 1
+
+    use_fallback = bool(fallback_model and budget is not None and budget.nearly_exhausted())
+    if use_fallback:
+        print(f"⏩ {stage}: latency budget nearly spent, falling back to {fallback_model}")
+        model = fallback_model
+        LLM_CALL_STATS[f"{stage}.fallback"] += 1
+    else:
+        LLM_CALL_STATS[f"{stage}.primary"] += 1
+
+    timeout = budget.stage_timeout(stage) if budget is not None else None
+    # Snapshot the contents so a hedged request sees the same prompt
+    if isinstance(contents, list):
+        contents = list(contents)
+
+    client = get_genai_client()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout if timeout is not None else None
+
+    cached_call = None
+    if cache_prompt and PROMPT_CACHE_ENABLED:
+        # No cache is created for the fallback model, which only runs when time is short
+        # Waiting for a new cache never eats more than the stage has left
+        max_wait = deadline - loop.time() if deadline is not None else None
+        cached_call = await get_prompt_cache().resolve(model, config, contents, create=not use_fallback,
+                                                        max_wait=max_wait)
+        if cached_call is not None:
+            LLM_CALL_STATS[f"{stage}.cached"] += 1
+
+    async def attempt():
+        if cached_call is not None:
+            cached_config, cached_contents, cache_name = cached_call
+            try:
+                return await client.aio.models.generate_content(model=model, config=cached_config,
+                                                                contents=cached_contents)
+            except Exception as e:
+                if not is_cache_error(e):
+                    raise
+                print(f"⚠️ {stage}: prompt cache {cache_name} is unavailable, sending the prompt inline")
+                get_prompt_cache().invalidate(cache_name)
+        return await client.aio.models.generate_content(model=model, config=config, contents=contents)
+
+    first_task = asyncio.ensure_future(attempt())
+    tasks = [first_task]
+    last_error = None
+
+    try:
+        if hedge_delay is not None and (timeout is None or hedge_delay < timeout):
+            done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+            if not done:
+                print(f"🔁 {stage}: no response after {hedge_delay:.1f}s, sending hedged request")
+                tasks.append(asyncio.ensure_future(attempt()))
+                LLM_CALL_STATS[f"{stage}.hedge_fired"] += 1
+
+        while tasks:
+            wait_for = max(0.0, deadline - loop.time()) if deadline is not None else None
+            done, _ = await asyncio.wait(tasks, timeout=wait_for, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                LLM_CALL_STATS[f"{stage}.timeout"] += 1
+                raise asyncio.TimeoutError(f"{stage} exceeded its {timeout:.1f}s deadline")
+
+            for task in done:
+                tasks.remove(task)
+                if task.exception() is None:
+                    if task is not first_task:
+                        LLM_CALL_STATS[f"{stage}.hedge_won"] += 1
+                    return task.result()
+                last_error = task.exception()
+
+        LLM_CALL_STATS[f"{stage}.error"] += 1
+        raise last_error
+    finally:
+        for task in tasks:
+            task.cancel()
+
+def get_llm_call_stats() -> Dict[str, Dict[str, int]]:
+    """
+    Return call-path counters grouped by stage.
+
+    Returns:
+        Mapping of stage -> {event: count}
+    """
+    stats = {}
+    for key, count in LLM_CALL_STATS.items():
+        stage, event = key.rsplit(".", 1)
+        stats.setdefault(stage, {})[event] = count
+    return stats
+
+def format_llm_call_stats() -> str:
+    """Render the call-path counters as a small table."""
+    events = ["calls", "primary", "fallback", "cached", "hedge_fired", "hedge_won", "timeout", "error"]
+    lines = [f"{'stage':<16}" + "".join(f"{event:>12}" for event in events)]
+    for stage, counts in get_llm_call_stats().items():
+        lines.append(f"{stage:<16}" + "".join(f"{counts.get(event, 0):>12}" for event in events))
+    return "\n".join(lines)
@@ -1,6 +1,14 @@
 import asyncio
 from google.genai import types
 from movie_db import process_user_query
+from db_connector import close_db_pool
+from llm_calls import format_llm_call_stats
+from rag_prefetch import format_prefetch_stats
+from prompt_cache import get_prompt_cache, format_prompt_cache_stats
+from entity_refresh import entity_refresh_loop
+from movie_view import movie_search_refresher
+from background_tasks import start_background_task, stop_background_tasks
+from config import ENTITY_REFRESH_INTERVAL_S, MOVIE_SEARCH_AUTO_REFRESH
 
 async def main():
     """
@@ -9,6 +17,13 @@ async def main():
     # Initialize conversation history
     conversation_history = []
     
+    # Keep entity lists in sync with the database in the background
+    background_tasks = []
+    if ENTITY_REFRESH_INTERVAL_S > 0:
+        start_background_task(entity_refresh_loop(ENTITY_REFRESH_INTERVAL_S), "entity refresh", background_tasks)
+    if MOVIE_SEARCH_AUTO_REFRESH:
+        start_background_task(movie_search_refresher(), "movie_search refresh", background_tasks)
+    
     print("\n" + "=" * 50)
     print("🎬 MOVIE MANIA CHATBOT 🎬")
     print("Ask questions about movies, actors, and more!")
@@ -17,11 +32,18 @@ async def main():
     
     while True:
         # Get user input
-        user_query = input("\n💬 Enter your question: ")
+        user_query = await asyncio.to_thread(input, "\n💬 Enter your question: ")
         
         # Check if user wants to exit
         if user_query.lower() == 'exit':
+            print("\n📈 LLM call paths this session:")
+            print(format_llm_call_stats())
+            print(f"🔮 RAG prefetch: {format_prefetch_stats()}")
+            print(f"🗄️ Prompt cache: {format_prompt_cache_stats()}")
             print("\nThank you for using Movie Mania Chatbot! Goodbye! 👋")
+            await stop_background_tasks(background_tasks)
+            await close_db_pool()
+            await get_prompt_cache().close()
             break
         
         # Add user query to conversation history
@@ -0,0 +1,191 @@
+"""
+Schema migrations for the movie database.
+
+Migrations run in order, each inside its own transaction, and are recorded in
+the schema_migrations table so re-running the tool is a no-op.
+
+Usage:
+    python migrations.py           # apply pending migrations
+    python migrations.py --list    # show applied/pending migrations
+"""
+import asyncio
+import argparse
+from typing import List, Tuple
+from db_connector import connect_to_db
+from entity_refresh import ALIAS_TABLE_DDL
+from movie_view import MOVIE_SEARCH_BASE_TABLES, MOVIE_SEARCH_CHANNEL
+
+# Indexes on movie_search; REFRESH ... CONCURRENTLY requires the unique one
+MOVIE_SEARCH_INDEXES = [
+    "CREATE UNIQUE INDEX IF NOT EXISTS movie_search_id_idx ON movie_search (id)",
+    "CREATE INDEX IF NOT EXISTS movie_search_actors_idx ON movie_search USING gin (actors)",
+    "CREATE INDEX IF NOT EXISTS movie_search_genres_idx ON movie_search USING gin (genres)",
+    "CREATE INDEX IF NOT EXISTS movie_search_languages_idx ON movie_search USING gin (languages)",
+    "CREATE INDEX IF NOT EXISTS movie_search_year_num_idx ON movie_search (year_num)",
+    "CREATE INDEX IF NOT EXISTS movie_search_imdb_rating_num_idx ON movie_search (imdb_rating_num)",
+    "CREATE INDEX IF NOT EXISTS movie_search_title_trgm_idx ON movie_search USING gin (title gin_trgm_ops)",
+]
+
+# (id, description, statements). Applied migrations are never edited; later
+# migrations change or undo earlier ones.
+MIGRATIONS: List[Tuple[str, str, List[str]]] = [
+    (
+        "0001_entity_aliases",
+        "Alias table for actor and movie nicknames",
+        [ALIAS_TABLE_DDL],
+    ),
+    (
+        "0002_typed_columns_and_search_indexes",
+        "Generated numeric year/rating columns, B-tree, lowercase and trigram indexes",
+        [
+            """ALTER TABLE movies ADD COLUMN IF NOT EXISTS year_num INTEGER
+               GENERATED ALWAYS AS (CASE WHEN year ~ '^[0-9]{4}$' THEN year::INTEGER END) STORED""",
+            """ALTER TABLE movies ADD COLUMN IF NOT EXISTS imdb_rating_num NUMERIC(3, 1)
+               GENERATED ALWAYS AS (CASE WHEN imdb_rating ~ '^[0-9]+([.][0-9]+)?$'
+                                         THEN imdb_rating::NUMERIC(3, 1) END) STORED""",
+            "CREATE INDEX IF NOT EXISTS movies_year_num_idx ON movies (year_num)",
+            "CREATE INDEX IF NOT EXISTS movies_imdb_rating_num_idx ON movies (imdb_rating_num)",
+            "CREATE INDEX IF NOT EXISTS movies_title_lower_idx ON movies (lower(title))",
+            "CREATE INDEX IF NOT EXISTS actors_name_lower_idx ON actors (lower(name))",
+            "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+            "CREATE INDEX IF NOT EXISTS movies_title_trgm_idx ON movies USING gin (title gin_trgm_ops)",
+            "CREATE INDEX IF NOT EXISTS movies_plot_trgm_idx ON movies USING gin (plot gin_trgm_ops)",
+            "CREATE INDEX IF NOT EXISTS actors_name_trgm_idx ON actors USING gin (name gin_trgm_ops)",
+            "ANALYZE movies",
+            "ANALYZE actors",
+        ],
+    ),
+    (
+        "0003_movie_search_view",
+        "Denormalized movie_search materialized view with array indexes and change notifications",
+        [
+            """CREATE MATERIALIZED VIEW IF NOT EXISTS movie_search AS
+               SELECT m.id, m.title, m.year, m.year_num, m.imdb_rating, m.imdb_rating_num, m.plot,
+                      ARRAY(SELECT a.name FROM movie_actors ma JOIN actors a ON a.id = ma.actor_id
+                            WHERE ma.movie_id = m.id ORDER BY a.name) AS actors,
+                      ARRAY(SELECT g.name FROM movie_genres mg JOIN genres g ON g.id = mg.genre_id
+                            WHERE mg.movie_id = m.id ORDER BY g.name) AS genres,
+                      ARRAY(SELECT l.name FROM movie_languages ml JOIN languages l ON l.id = ml.language_id
+                            WHERE ml.movie_id = m.id ORDER BY l.name) AS languages
+               FROM movies m""",
+        ] + MOVIE_SEARCH_INDEXES + [
+            f"""CREATE OR REPLACE FUNCTION notify_movie_search_stale() RETURNS trigger
+                LANGUAGE plpgsql AS $$
+                BEGIN
+                    PERFORM pg_notify('{MOVIE_SEARCH_CHANNEL}', TG_TABLE_NAME);
+                    RETURN NULL;
+                END
+                $$""",
+        ] + [
+            statement
+            for table in MOVIE_SEARCH_BASE_TABLES
+            for statement in (
+                f"DROP TRIGGER IF EXISTS movie_search_stale ON {table}",
+                f"""CREATE TRIGGER movie_search_stale
+                    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+                    FOR EACH STATEMENT EXECUTE FUNCTION notify_movie_search_stale()""",
+            )
+        ] + ["ANALYZE movie_search"],
+    ),
+    (
+        "0004_movie_full_text_search",
+        "Precomputed title/plot tsvector with a GIN index for hybrid retrieval",
+        [
+            """ALTER TABLE movies ADD COLUMN IF NOT EXISTS search_tsv tsvector
+               GENERATED ALWAYS AS (
+                   setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+                   setweight(to_tsvector('english', coalesce(plot, '')), 'B')
+               ) STORED""",
+            "CREATE INDEX IF NOT EXISTS movies_search_tsv_idx ON movies USING gin (search_tsv)",
+            "ANALYZE movies",
+        ],
+    ),
+    (
+        "0005_drop_lowercase_indexes",
+        "Drop lower(title)/lower(name) indexes; text is stored lowercase and queries never call LOWER()",
+        [
+            "DROP INDEX IF EXISTS movies_title_lower_idx",
+            "DROP INDEX IF EXISTS actors_name_lower_idx",
+        ],
+    ),
+    (
+        "0006_movie_search_text_arrays",
+        "Rebuild movie_search with TEXT[] arrays so @> ARRAY['...'] comparisons work on varchar names",
+        [
+            "DROP MATERIALIZED VIEW IF EXISTS movie_search",
+            """CREATE MATERIALIZED VIEW movie_search AS
+               SELECT m.id, m.title, m.year, m.year_num, m.imdb_rating, m.imdb_rating_num, m.plot,
+                      ARRAY(SELECT a.name::text FROM movie_actors ma JOIN actors a ON a.id = ma.actor_id
+                            WHERE ma.movie_id = m.id ORDER BY a.name) AS actors,
+                      ARRAY(SELECT g.name::text FROM movie_genres mg JOIN genres g ON g.id = mg.genre_id
+                            WHERE mg.movie_id = m.id ORDER BY g.name) AS genres,
+                      ARRAY(SELECT l.name::text FROM movie_languages ml JOIN languages l ON l.id = ml.language_id
+                            WHERE ml.movie_id = m.id ORDER BY l.name) AS languages
+               FROM movies m""",
+        ] + MOVIE_SEARCH_INDEXES + ["ANALYZE movie_search"],
+    ),
+]
+
+SCHEMA_MIGRATIONS_DDL = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    id TEXT PRIMARY KEY,
+    applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+)
+"""
+
+async def get_applied_migrations(connection) -> set:
+    """Return the ids of migrations that have already been applied."""
+    await connection.execute(SCHEMA_MIGRATIONS_DDL)
+    return {row["id"] for row in await connection.fetch("SELECT id FROM schema_migrations")}
+
+async def apply_migrations(pool) -> List[str]:
+    """
+    Apply all pending migrations in order.
+
+    Args:
+        pool: Database connection pool
+
+    Returns:
+        Ids of the migrations applied by this run
+    """
+    applied_now = []
+    async with pool.acquire() as connection:
+        applied = await get_applied_migrations(connection)
+        for migration_id, description, statements in MIGRATIONS:
+            if migration_id in applied:
+                continue
+            print(f"🛠️ Applying {migration_id}: {description}")
+            async with connection.transaction():
+                for statement in statements:
+                    await connection.execute(statement)
+                await connection.execute("INSERT INTO schema_migrations (id) VALUES ($1)", migration_id)
+            applied_now.append(migration_id)
+    return applied_now
+
+async def main():
+    parser = argparse.ArgumentParser(description="Apply movie database schema migrations")
+    parser.add_argument("--list", action="store_true", help="Show migration status without applying")
+    args = parser.parse_args()
+
+    pool = await connect_to_db()
+    if not pool:
+        return
+    try:
+        if args.list:
+            async with pool.acquire() as connection:
+                applied = await get_applied_migrations(connection)
+            for migration_id, description, _ in MIGRATIONS:
+                status = "applied" if migration_id in applied else "pending"
+                print(f"  [{status:>7}] {migration_id} – {description}")
+            return
+
+        applied_now = await apply_migrations(pool)
+        if applied_now:
+            print(f"✅ Applied {len(applied_now)} migration(s)")
+        else:
+            print("✅ Schema is up to date")
+    finally:
+        await pool.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -4,20 +4,20 @@ from google.genai import types
 from entity_extraction import extract_movie_info
 from fuzzy_matching import fuzzy_match_entities
 from sql_generation import get_sql_from_gemini
-from db_connector import connect_to_db, execute_query
+from db_connector import get_db_pool, execute_query
 from answer_validation import validate_movie_query_response
-from rag_search import search_rag_movies
-from config import GEMINI_API_KEY
-from google import genai
-
-# Initialize Google Generative AI client
-client = genai.Client(api_key=GEMINI_API_KEY)
+from rag_search import search_rag_movies, hybrid_search_rag_movies
+from rag_prefetch import RagPrefetcher, speculative_rag_prompts
+from rag_fusion import fuse_rag_documents
+from config import PRIMARY_MODEL, SQL_GUARD_MAX_RETRIES, RAG_SEARCH_MODE, SPECULATIVE_RAG
+from llm_calls import TurnBudget, generate_content, track_stage, mark_degraded
 
 async def query_movies_db(question: str, 
                          extracted_movies: Optional[List[str]] = None, 
                          extracted_actors: Optional[List[str]] = None, 
                          task: Optional[str] = None, 
-                         conversation_history: List = None) -> Dict[str, Any]:
+                         conversation_history: List = None,
+                         budget: Optional[TurnBudget] = None) -> Dict[str, Any]:
     """
     Process natural language query and return database results.
     
@@ -27,20 +27,23 @@ async def query_movies_db(question: str,
         extracted_actors: List of actors extracted from the query
         task: The task extracted from the query
         conversation_history: Conversation history
+        budget: Optional latency budget for the current turn
         
     Returns:
         Dict containing SQL response and data
     """
     # Get SQL query from Gemini
-    sql_object = await get_sql_from_gemini(question, extracted_movies, extracted_actors, task, conversation_history)
+    with track_stage(budget, "sql_generation"):
+        sql_object = await get_sql_from_gemini(question, extracted_movies, extracted_actors, task, conversation_history, budget)
     
     # Print SQL reasoning
     if "reason" in sql_object:
         print(f"📝 SQL reasoning: {sql_object['reason']}")
     
-    # Create DB connection pool
-    pool = await connect_to_db()
+    # Get the shared DB connection pool
+    pool = await get_db_pool()
     if not pool:
+        mark_degraded(budget, "sql_execution", "database connection failed")
         return {
             "sql_tool_response": sql_object,
             "sql_data": "Failed to connect to database",
@@ -48,8 +51,25 @@ async def query_movies_db(question: str,
         }
     
     try:
-        # Execute the query
-        data = await execute_query(pool, sql_object)
+        # Execute the query; if the guard rejects queries, regenerate them with the reasons
+        for attempt in range(SQL_GUARD_MAX_RETRIES + 1):
+            rejections = []
+            with track_stage(budget, "sql_execution"):
+                data = await execute_query(pool, sql_object, rejections)
+            if not rejections or attempt == SQL_GUARD_MAX_RETRIES:
+                break
+            if budget is not None and budget.remaining() <= 0:
+                break
+            
+            print("🔁 Regenerating SQL with guard feedback")
+            if conversation_history is not None:
+                conversation_history.append(types.Content(
+                    role="model",
+                    parts=[types.Part.from_text(text=str(sql_object))],
+                ))
+            with track_stage(budget, "sql_generation"):
+                sql_object = await get_sql_from_gemini(question, extracted_movies, extracted_actors, task,
+                                                       conversation_history, budget, feedback=rejections)
         
         # Add the SQL query to the result for reference
         result_dict = {
@@ -57,27 +77,44 @@ async def query_movies_db(question: str,
             "sql_data": data,
             "note": "each sql data correspond to query in sql_tool_response -> sql_queries"
         }
-        # Close the pool
-        await pool.close()
         
         return result_dict
     
     except Exception as e:
         print(f"❌ Error during database query: {str(e)}")
-        await pool.close()
+        mark_degraded(budget, "sql_execution", e)
         return {
             "sql_tool_response": sql_object,
             "sql_data": "Failed to execute query",
             "note": f"Error: {str(e)}"
         }
 
-async def process_user_query(user_query: str, conversation_history: List) -> str:
+async def run_rag_search(query: str, rag_filter=None) -> List[Dict[str, Any]]:
+    """
+    Run a RAG search for one prompt using the configured retrieval mode.
+    
+    Args:
+        query: RAG prompt (movie title or plot phrase)
+        rag_filter: Optional RAGFilter
+        
+    Returns:
+        List of movie payloads
+    """
+    if RAG_SEARCH_MODE == "hybrid":
+        return await hybrid_search_rag_movies(query, rag_filter, await get_db_pool())
+    return await asyncio.to_thread(search_rag_movies, query, rag_filter)
+
+async def process_user_query(user_query: str, conversation_history: List,
+                             budget: Optional[TurnBudget] = None) -> str:
     """
     Process a user query and generate a response.
     
     Args:
         user_query: The user's natural language query
         conversation_history: List of previous conversation messages
+        budget: Latency budget for this turn; a default one is created if omitted.
+            Per-stage timings are recorded in budget.stage_timings, and stages
+            that fell back to a canned answer in budget.degraded
         
     Returns:
         Final answer to the user's query
@@ -86,89 +123,122 @@ async def process_user_query(user_query: str, conversation_history: List) -> str
     print(f"📝 New query: {user_query}")
     print("=" * 50)
     
+    if budget is None:
+        budget = TurnBudget()
+    
     # Step 1: Extract movie information from the query
-    extracted_info = extract_movie_info(user_query)
+    with budget.track("extraction"):
+        extracted_info = await extract_movie_info(user_query, budget)
     
     # Step 2: Perform fuzzy matching on extracted entities
-    corrected_actors, corrected_movies = fuzzy_match_entities(
-        extracted_info.Actors, extracted_info.Title
-    )
-    
-    # Step 3: Query the database
-    db_result = await query_movies_db(
-        user_query, 
-        corrected_movies, 
-        corrected_actors, 
-        extracted_info.Task,
-        conversation_history
-    )
-    
-    # Add the database result to the conversation history
-    model_message = types.Content(
-        role="model",
-        parts=[types.Part.from_text(text=str(db_result))],
-    )
-    conversation_history.append(model_message)
-    
-    # Step 4: Validate if the SQL results answer the query or if RAG is needed
-    validation_result = validate_movie_query_response(conversation_history)
-    
-    # Step 5: Generate the final answer
-    final_answer = None
-    
-    if validation_result.further_search:
-        if not validation_result.rag_prompt:
-            print("❓ No RAG prompts available, using direct answer")
-            final_answer = validation_result.direct_answer
-            conversation_history.append(types.Content(
-                role="model",
-                parts=[types.Part.from_text(text=str(final_answer))],
-            ))
-        else:
-            # Perform RAG search
-            print(f"🔍 Performing RAG search with prompts: {validation_result.rag_prompt}")
-            validation_json = validation_result.model_dump()
-            documents_rag = {}
+    with budget.track("fuzzy_matching"):
+        corrected_actors, corrected_movies = fuzzy_match_entities(
+            extracted_info.Actors, extracted_info.Title
+        )
+    
+    # Speculatively start similarity searches the validator is likely to request
+    prefetcher = RagPrefetcher(run_rag_search)
+    if SPECULATIVE_RAG:
+        prefetcher.start(speculative_rag_prompts(user_query, extracted_info, corrected_movies))
+    
+    try:
+        # Step 3: Query the database
+        db_result = await query_movies_db(
+            user_query, 
+            corrected_movies, 
+            corrected_actors, 
+            extracted_info.Task,
+            conversation_history,
+            budget
+        )
+    
+        # Add the database result to the conversation history
+        model_message = types.Content(
+            role="model",
+            parts=[types.Part.from_text(text=str(db_result))],
+        )
+        conversation_history.append(model_message)
+    
+        # Step 4: Validate if the SQL results answer the query or if RAG is needed
+        with budget.track("validation"):
+            validation_result = await validate_movie_query_response(conversation_history, budget)
+    
+        # Step 5: Generate the final answer
+        final_answer = None
+    
+        if validation_result.further_search:
+            if not validation_result.rag_prompt:
+                print("❓ No RAG prompts available, using direct answer")
+                final_answer = validation_result.direct_answer
+                conversation_history.append(types.Content(
+                    role="model",
+                    parts=[types.Part.from_text(text=str(final_answer))],
+                ))
+            else:
+                # Perform RAG search
+                print(f"🔍 Performing RAG search with prompts: {validation_result.rag_prompt}")
+                validation_json = validation_result.model_dump()
+                documents_rag = {}
             
-            # Search for each RAG prompt
-            for query in validation_result.rag_prompt:
-                rag_results = search_rag_movies(query, validation_result.rag_filter)
-                documents_rag[query] = rag_results
+                # Search for all RAG prompts concurrently
+                async def search_prompt(query):
+                    # Reuse a matching prefetched search, otherwise search now
+                    prefetched = await prefetcher.take(query, validation_result.rag_filter)
+                    if prefetched is not None:
+                        return prefetched
+                    return await run_rag_search(query, validation_result.rag_filter)
             
-            # Add RAG results to the validation data
-            validation_json.update({"rag_documents": documents_rag})
+                with budget.track("rag_search"):
+                    rag_results = await asyncio.gather(*[
+                        search_prompt(query) for query in validation_result.rag_prompt
+                    ])
+                for query, results in zip(validation_result.rag_prompt, rag_results):
+                    documents_rag[query] = results
             
-            # Add RAG results to conversation history
-            conversation_history.append(types.Content(
-                role="model",
-                parts=[types.Part.from_text(text=str(validation_json))],
-            ))
+                # Deduplicate and rank documents across prompts, then add them to the validation data
+                validation_json.update({"rag_documents": fuse_rag_documents(documents_rag)})
             
-            # Generate final answer using RAG results
-            print("🧠 Generating final answer using RAG results...")
-            final_response = client.models.generate_content(
-                model="gemini-2.5-flash-preview-04-17",
-                config=types.GenerateContentConfig(
-                    system_instruction="Based on the provided RAG documents, answer the user's recent question. Try to be flexible and brainstorm what user is asking and give satisfactory answer. If the answer cannot be found in the RAG documents, answer \"I'm sorry, I don't know the answer to that question.\"",
-                    temperature=0.1,
-                ),
-                contents=conversation_history
-            )
+                # Add RAG results to conversation history
+                conversation_history.append(types.Content(
+                    role="model",
+                    parts=[types.Part.from_text(text=str(validation_json))],
+                ))
             
-            final_answer = final_response.text
+                # Generate final answer using RAG results
+                print("🧠 Generating final answer using RAG results...")
+                try:
+                    with budget.track("final_answer"):
+                        final_response = await generate_content(
+                            "final_answer",
+                            model=PRIMARY_MODEL,
+                            config=types.GenerateContentConfig(
+                                system_instruction="Based on the provided RAG documents, answer the user's recent question. Try to be flexible and brainstorm what user is asking and give satisfactory answer. If the answer cannot be found in the RAG documents, answer \"I'm sorry, I don't know the answer to that question.\"",
+                                temperature=0.1,
+                            ),
+                            contents=conversation_history,
+                            budget=budget
+                        )
+                    final_answer = final_response.text
+                except Exception as e:
+                    print(f"❌ Error generating final answer: {str(e)}")
+                    mark_degraded(budget, "final_answer", e)
+                    final_answer = validation_result.direct_answer or "I'm sorry, I couldn't answer that in time. Please try again."
             
-            # Add final answer to conversation history
+                # Add final answer to conversation history
+                conversation_history.append(types.Content(
+                    role="model",
+                    parts=[types.Part.from_text(text=str(final_answer))],
+                ))
+        else:
+            # Use the direct answer from SQL validation
+            print("✅ Using direct answer from SQL results")
+            final_answer = validation_result.direct_answer
             conversation_history.append(types.Content(
                 role="model",
                 parts=[types.Part.from_text(text=str(final_answer))],
             ))
-    else:
-        # Use the direct answer from SQL validation
-        print("✅ Using direct answer from SQL results")
-        final_answer = validation_result.direct_answer
-        conversation_history.append(types.Content(
-            role="model",
-            parts=[types.Part.from_text(text=str(final_answer))],
-        ))
+    finally:
+        # Drop speculative searches the validator did not ask for, even if the turn failed
+        prefetcher.discard()
     
     return final_answer
\ No newline at end of file
@@ -0,0 +1,87 @@
+"""
+Keep the denormalized movie_search materialized view fresh.
+
+Triggers on the base tables send a notification on MOVIE_SEARCH_CHANNEL after
+every committed change. The refresher listens for it, waits for the burst of
+changes to settle, and runs REFRESH MATERIALIZED VIEW CONCURRENTLY, which only
+writes the rows that changed and never blocks readers. The chatbot and the batch
+CLI run the refresher by default (MOVIE_SEARCH_AUTO_REFRESH); it refreshes once
+on start to pick up changes made while nothing was listening.
+
+Usage:
+    python movie_view.py            # refresh once
+    python movie_view.py --listen   # keep refreshing as the base tables change
+"""
+import time
+import asyncio
+import asyncpg
+import argparse
+from config import DB_CONFIG, MOVIE_SEARCH_REFRESH_DEBOUNCE_S
+
+MOVIE_SEARCH_CHANNEL = "movie_search_stale"
+MOVIE_SEARCH_BASE_TABLES = [
+    "movies", "actors", "genres", "languages",
+    "movie_actors", "movie_genres", "movie_languages",
+]
+
+async def refresh_movie_search(connection) -> float:
+    """
+    Refresh the movie_search view without blocking readers.
+
+    Args:
+        connection: asyncpg connection (or pool)
+
+    Returns:
+        Seconds the refresh took
+    """
+    started = time.perf_counter()
+    await connection.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY movie_search")
+    elapsed = time.perf_counter() - started
+    print(f"✅ movie_search refreshed in {elapsed:.2f}s")
+    return elapsed
+
+async def movie_search_refresher(debounce: float = MOVIE_SEARCH_REFRESH_DEBOUNCE_S) -> None:
+    """
+    Listen for base-table changes and refresh movie_search after each burst.
+
+    Args:
+        debounce: Seconds to wait after a change so bulk updates refresh once
+    """
+    listener = await asyncpg.connect(**DB_CONFIG)
+    stale = asyncio.Event()
+    listener_callback = lambda *_: stale.set()
+    await listener.add_listener(MOVIE_SEARCH_CHANNEL, listener_callback)
+    print(f"👂 Listening for changes on '{MOVIE_SEARCH_CHANNEL}'")
+    # Catch up on changes committed while no listener was running
+    stale.set()
+
+    try:
+        while True:
+            await stale.wait()
+            await asyncio.sleep(debounce)
+            stale.clear()
+            try:
+                await refresh_movie_search(listener)
+            except Exception as e:
+                print(f"❌ movie_search refresh failed: {str(e)}")
+    finally:
+        await listener.remove_listener(MOVIE_SEARCH_CHANNEL, listener_callback)
+        await listener.close()
+
+async def main():
+    parser = argparse.ArgumentParser(description="Refresh the movie_search materialized view")
+    parser.add_argument("--listen", action="store_true", help="Keep refreshing as the base tables change")
+    args = parser.parse_args()
+
+    if args.listen:
+        await movie_search_refresher()
+        return
+
+    connection = await asyncpg.connect(**DB_CONFIG)
+    try:
+        await refresh_movie_search(connection)
+    finally:
+        await connection.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
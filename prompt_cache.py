@@ -0,0 +1,249 @@
+"""
+Context caching for the large static parts of LLM prompts.
+
+The SQL and validator system instructions are several KB each and used to be
+resent with every call. PromptCache registers each instruction once as cached
+content on the Gemini API, optionally together with the stable early part of
+the conversation, and the calls reference the cache instead. Caches in use are
+extended before their TTL runs out. Whenever a cache cannot be created or has
+disappeared, the prompt is sent inline as before.
+
+The client is injectable (and get_genai_client honours GEMINI_BASE_URL), so the
+layer can be exercised against a local stub of the API.
+"""
+import time
+import json
+import hashlib
+import asyncio
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from clients import get_genai_client
+from config import (PROMPT_CACHE_TTL_S, PROMPT_CACHE_REFRESH_MARGIN_S, PROMPT_CACHE_MIN_TOKENS,
+                    PROMPT_CACHE_CREATE_TIMEOUT_S, PROMPT_CACHE_RETRY_AFTER_S, PROMPT_CACHE_HISTORY_STEP)
+
+# Cache lifecycle events: created, reused, refreshed, inline, failed, invalidated
+PROMPT_CACHE_STATS = Counter()
+
+class CacheEntry(NamedTuple):
+    name: str
+    expires_at: float  # time.monotonic() deadline
+
+def _serialize(content: Any) -> str:
+    if hasattr(content, "model_dump_json"):
+        return content.model_dump_json(exclude_none=True)
+    return json.dumps(content, sort_keys=True, default=str)
+
+def _config_value(config: Any, field: str) -> Any:
+    if isinstance(config, dict):
+        return config.get(field)
+    return getattr(config, field, None)
+
+def estimate_tokens(system_instruction: str, contents: List[Any]) -> int:
+    """Rough token count (about four characters per token) of a prefix."""
+    return (len(system_instruction) + sum(len(_serialize(content)) for content in contents)) // 4
+
+def is_cache_error(error: Exception) -> bool:
+    """Whether an API error means the referenced cached content is gone or unusable."""
+    return getattr(error, "code", None) in (400, 403, 404) and "cache" in str(error).lower()
+
+def with_cached_content(config: Any, cache_name: str) -> Any:
+    """
+    Copy a generation config so it references a cache instead of the system instruction.
+
+    Args:
+        config: GenerateContentConfig or dict
+        cache_name: Name of the cached content
+
+    Returns:
+        New config of the same type
+    """
+    if isinstance(config, dict):
+        return dict(config, system_instruction=None, cached_content=cache_name)
+    return config.model_copy(update={"system_instruction": None, "cached_content": cache_name})
+
+class PromptCache:
+    """
+    Creates, reuses and refreshes cached contents keyed by model, system
+    instruction and cached history prefix.
+    """
+
+    def __init__(self, client: Any = None,
+                 ttl_s: float = PROMPT_CACHE_TTL_S,
+                 refresh_margin_s: float = PROMPT_CACHE_REFRESH_MARGIN_S,
+                 min_tokens: int = PROMPT_CACHE_MIN_TOKENS,
+                 create_timeout_s: float = PROMPT_CACHE_CREATE_TIMEOUT_S,
+                 retry_after_s: float = PROMPT_CACHE_RETRY_AFTER_S,
+                 history_step: int = PROMPT_CACHE_HISTORY_STEP):
+        self._client = client
+        self.ttl_s = ttl_s
+        self.refresh_margin_s = refresh_margin_s
+        self.min_tokens = min_tokens
+        self.create_timeout_s = create_timeout_s
+        self.retry_after_s = retry_after_s
+        self.history_step = history_step
+        self._entries: Dict[str, CacheEntry] = {}
+        self._pending: Dict[str, asyncio.Task] = {}
+        self._failed_until: Dict[str, float] = {}
+
+    @property
+    def client(self):
+        return self._client if self._client is not None else get_genai_client()
+
+    def split_contents(self, contents: Any) -> Tuple[List[Any], Any]:
+        """
+        Split call contents into the history prefix to cache and the part sent with the call.
+
+        The prefix grows in whole blocks of history_step messages, so it stays
+        identical across the calls of a session until the next block fills up,
+        and the latest message is always sent with the call.
+
+        Args:
+            contents: Call contents (only lists have a cacheable history)
+
+        Returns:
+            (cached prefix, remaining contents)
+        """
+        if not self.history_step or not isinstance(contents, list):
+            return [], contents
+        cached_length = (len(contents) - 1) // self.history_step * self.history_step
+        return list(contents[:cached_length]), list(contents[cached_length:])
+
+    def _key(self, model: str, system_instruction: str, prefix: List[Any]) -> str:
+        digest = hashlib.sha256(f"{model}\0{system_instruction}".encode("utf-8"))
+        for content in prefix:
+            digest.update(b"\0" + _serialize(content).encode("utf-8"))
+        return digest.hexdigest()
+
+    def _schedule(self, key: str, coroutine) -> asyncio.Task:
+        task = asyncio.ensure_future(coroutine)
+        self._pending[key] = task
+        task.add_done_callback(lambda _: self._pending.pop(key, None))
+        return task
+
+    async def resolve(self, model: str, config: Any, contents: Any, create: bool = True,
+                      max_wait: Optional[float] = None) -> Optional[Tuple[Any, Any, str]]:
+        """
+        Find or create the cache for a call and rewrite the call to use it.
+
+        Args:
+            model: Model of the call; caches are bound to one model
+            config: GenerateContentConfig (or dict) holding the system instruction
+            contents: Full call contents
+            create: Whether a missing cache may be created now
+            max_wait: Time the caller has left; caps the wait for a creation below create_timeout_s
+
+        Returns:
+            (config, contents, cache name) for the cached call, or None to send the prompt inline
+        """
+        system_instruction = _config_value(config, "system_instruction")
+        if not isinstance(system_instruction, str) or not system_instruction:
+            return None
+        prefix, remaining = self.split_contents(contents)
+        key = self._key(model, system_instruction, prefix)
+        now = time.monotonic()
+
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= now:
+            del self._entries[key]
+            entry = None
+
+        if entry is None:
+            if not create or self._failed_until.get(key, 0.0) > now:
+                PROMPT_CACHE_STATS["inline"] += 1
+                return None
+            if estimate_tokens(system_instruction, prefix) < self.min_tokens:
+                PROMPT_CACHE_STATS["inline"] += 1
+                return None
+            task = self._pending.get(key) or self._schedule(key, self._create(key, model, system_instruction, prefix))
+            wait = self.create_timeout_s if max_wait is None else max(0.0, min(self.create_timeout_s, max_wait))
+            try:
+                # Shielded so a slow creation still finishes for later calls
+                entry = await asyncio.wait_for(asyncio.shield(task), wait)
+            except asyncio.TimeoutError:
+                entry = None
+            if entry is None:
+                PROMPT_CACHE_STATS["inline"] += 1
+                return None
+        else:
+            PROMPT_CACHE_STATS["reused"] += 1
+            if entry.expires_at - now < self.refresh_margin_s and key not in self._pending:
+                self._schedule(key, self._refresh(key, entry))
+
+        return with_cached_content(config, entry.name), remaining, entry.name
+
+    async def _create(self, key: str, model: str, system_instruction: str,
+                      prefix: List[Any]) -> Optional[CacheEntry]:
+        from google.genai import types
+        started = time.monotonic()
+        try:
+            cached_content = await self.client.aio.caches.create(
+                model=model,
+                config=types.CreateCachedContentConfig(
+                    display_name=f"movie-bot-{key[:16]}",
+                    system_instruction=system_instruction,
+                    contents=prefix or None,
+                    ttl=f"{int(self.ttl_s)}s",
+                ),
+            )
+        except Exception as e:
+            print(f"⚠️ Prompt cache unavailable for {model}, sending prompts inline: {str(e)}")
+            self._failed_until[key] = time.monotonic() + self.retry_after_s
+            PROMPT_CACHE_STATS["failed"] += 1
+            return None
+
+        entry = CacheEntry(cached_content.name, started + self.ttl_s)
+        self._entries[key] = entry
+        print(f"🗄️ Cached prompt prefix for {model} as {entry.name} ({len(prefix)} history messages)")
+        PROMPT_CACHE_STATS["created"] += 1
+        return entry
+
+    async def _refresh(self, key: str, entry: CacheEntry) -> None:
+        from google.genai import types
+        started = time.monotonic()
+        try:
+            await self.client.aio.caches.update(
+                name=entry.name,
+                config=types.UpdateCachedContentConfig(ttl=f"{int(self.ttl_s)}s"),
+            )
+        except Exception as e:
+            print(f"⚠️ Could not extend prompt cache {entry.name}: {str(e)}")
+            if is_cache_error(e):
+                self.invalidate(entry.name)
+            return
+        if self._entries.get(key) == entry:
+            self._entries[key] = CacheEntry(entry.name, started + self.ttl_s)
+        PROMPT_CACHE_STATS["refreshed"] += 1
+
+    def invalidate(self, cache_name: str) -> None:
+        """Forget a cache the API no longer accepts; the next call recreates it."""
+        for key, entry in list(self._entries.items()):
+            if entry.name == cache_name:
+                del self._entries[key]
+                PROMPT_CACHE_STATS["invalidated"] += 1
+
+    async def close(self) -> None:
+        """Delete the caches created by this process instead of waiting for their TTL."""
+        for task in list(self._pending.values()):
+            task.cancel()
+        for entry in list(self._entries.values()):
+            try:
+                await self.client.aio.caches.delete(name=entry.name)
+            except Exception as e:
+                print(f"⚠️ Could not delete prompt cache {entry.name}: {str(e)}")
+        self._entries.clear()
+
+@lru_cache(maxsize=None)
+def get_prompt_cache() -> PromptCache:
+    """
+    Return the shared prompt cache, creating it on first use.
+
+    Returns:
+        PromptCache instance
+    """
+    return PromptCache()
+
+def format_prompt_cache_stats() -> str:
+    """Summarise cache reuse and fallbacks."""
+    return ", ".join(f"{event} {PROMPT_CACHE_STATS[event]}"
+                     for event in ["created", "reused", "refreshed", "inline", "failed", "invalidated"])
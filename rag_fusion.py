@@ -0,0 +1,104 @@
+import re
+from typing import List, Dict, Any, Optional
+from config import RRF_K, RAG_FUSED_DOC_LIMIT, RAG_MMR_LAMBDA
+from entity_cache import get_entity_lists, normalize_entity
+from rag_search import movie_key
+
+_WORD = re.compile(r"[a-z]{4,}")
+
+def _features(payload: Dict[str, Any]) -> set:
+    """Genre, actor and plot-word features used to measure how alike two movies are."""
+    features = {f"genre:{genre}" for genre in payload.get("Genre") or []}
+    features |= {f"actor:{actor}" for actor in payload.get("Actors") or []}
+    features |= set(_WORD.findall(str(payload.get("Plot") or "").lower()))
+    return features
+
+def _similarity(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+def _mmr_select(candidates: List[Dict[str, Any]], scores: Dict[str, float],
+                limit: int, mmr_lambda: float) -> List[Dict[str, Any]]:
+    """
+    Pick documents by maximal marginal relevance.
+
+    Args:
+        candidates: Documents ordered by fused score
+        scores: Fused score per movie key
+        limit: Number of documents to keep
+        mmr_lambda: Weight of relevance versus diversity (1.0 = relevance only)
+
+    Returns:
+        Selected documents in selection order
+    """
+    top_score = max(scores.values()) if scores else 1.0
+    features = {movie_key(doc): _features(doc) for doc in candidates}
+    remaining = list(candidates)
+    selected = []
+    while remaining and len(selected) < limit:
+        def marginal_relevance(doc):
+            key = movie_key(doc)
+            redundancy = max((_similarity(features[key], features[movie_key(chosen)]) for chosen in selected),
+                             default=0.0)
+            return mmr_lambda * scores[key] / top_score - (1 - mmr_lambda) * redundancy
+        best = max(remaining, key=marginal_relevance)
+        selected.append(best)
+        remaining.remove(best)
+    return selected
+
+def fuse_rag_documents(documents_rag: Dict[str, List[Dict[str, Any]]],
+                       limit: int = RAG_FUSED_DOC_LIMIT,
+                       mmr_lambda: Optional[float] = RAG_MMR_LAMBDA) -> List[Dict[str, Any]]:
+    """
+    Merge per-prompt RAG results into one deduplicated, ranked document set.
+
+    Scores are combined with reciprocal rank fusion, so a movie found by
+    several prompts ranks higher, and each document records which prompts
+    matched it. Source movies of similarity prompts (the title itself) are
+    kept first and do not count towards the limit.
+
+    Args:
+        documents_rag: RAG prompt -> results, best first
+        limit: Maximum number of fused documents besides the source movies
+        mmr_lambda: Optional MMR weight for a diversity cut; None ranks by score only
+
+    Returns:
+        Ranked list of movie payloads with matched_prompts and fused_score
+    """
+    entity_lists = get_entity_lists()
+    scores: Dict[str, float] = {}
+    documents: Dict[str, Dict[str, Any]] = {}
+    source_keys = []
+    source_titles = set()
+
+    for prompt, results in documents_rag.items():
+        prompt_title = normalize_entity(entity_lists.movie_aliases.get(normalize_entity(prompt), prompt))
+        for rank, payload in enumerate(results):
+            key = movie_key(payload)
+            if key not in documents:
+                documents[key] = dict(payload, matched_prompts=[])
+            if prompt not in documents[key]["matched_prompts"]:
+                documents[key]["matched_prompts"].append(prompt)
+                scores[key] = scores.get(key, 0.0) + 1.0 / (RRF_K + rank + 1)
+            # The first hit carrying the prompt's own title is the source movie (remakes share titles)
+            if (prompt_title not in source_titles and key not in source_keys
+                    and normalize_entity(str(payload.get("Title", ""))) == prompt_title):
+                source_keys.append(key)
+                source_titles.add(prompt_title)
+
+    for key, document in documents.items():
+        document["fused_score"] = round(scores.get(key, 0.0), 4)
+
+    candidates = sorted((documents[key] for key in documents if key not in source_keys),
+                        key=lambda doc: scores[movie_key(doc)], reverse=True)
+    if mmr_lambda is None:
+        ranked = candidates[:limit]
+    else:
+        ranked = _mmr_select(candidates, {key: scores[key] for key in scores if key not in source_keys},
+                             limit, mmr_lambda)
+
+    fused = [documents[key] for key in source_keys] + ranked
+    total = sum(len(results) for results in documents_rag.values())
+    print(f"🧩 Fused {total} RAG documents from {len(documents_rag)} prompts into {len(fused)}")
+    return fused
@@ -0,0 +1,123 @@
+import re
+import asyncio
+from collections import Counter
+from typing import Awaitable, Callable, Dict, List, Any, Optional
+from entity_cache import get_entity_lists, normalize_entity
+from models import MovieInfo
+
+# Outcomes of speculative RAG searches: launched, hit, miss, filtered, wasted, error
+PREFETCH_STATS = Counter()
+
+SIMILARITY_INTENT = re.compile(
+    r"\b(similar|like|recommend\w*|suggest\w*|comparable|same vibe|same as|along the lines)\b",
+    re.IGNORECASE,
+)
+
+def _prompt_key(prompt: str) -> str:
+    """Match key for a RAG prompt: the canonical title for aliases, normalised."""
+    key = normalize_entity(prompt)
+    return normalize_entity(get_entity_lists().movie_aliases.get(key, key))
+
+def speculative_rag_prompts(user_query: str, extracted_info: MovieInfo,
+                            corrected_movies: List[str]) -> List[str]:
+    """
+    Guess the RAG prompts the validator will ask for before it runs.
+
+    Only similarity/recommendation requests about known titles are predicted:
+    for those the validator's rag_prompt is the title itself, whereas plot
+    searches use phrases the validator writes and cannot be anticipated.
+
+    Args:
+        user_query: The user's question
+        extracted_info: Extracted entities and task
+        corrected_movies: Fuzzy-matched titles
+
+    Returns:
+        Known titles worth prefetching
+    """
+    if not SIMILARITY_INTENT.search(f"{extracted_info.Task} {user_query}"):
+        return []
+    movie_keys = get_entity_lists().movie_keys
+    return [title for title in dict.fromkeys(corrected_movies)
+            if title and _prompt_key(title) in movie_keys]
+
+def _has_filter_values(rag_filter) -> bool:
+    if not rag_filter:
+        return False
+    return any(getattr(rag_filter, field, None)
+               for field in ["Title", "Genre", "Year", "Actors", "ImdbRating"])
+
+class RagPrefetcher:
+    """
+    Runs RAG searches speculatively while SQL generation and validation are in
+    flight, and hands the results over if the validator asks for the same prompts.
+    """
+
+    def __init__(self, search: Callable[..., Awaitable[List[Dict[str, Any]]]]):
+        self.search = search
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._speculated = False
+
+    def start(self, prompts: List[str]) -> None:
+        """Launch unfiltered searches for the predicted prompts."""
+        for prompt in prompts:
+            key = _prompt_key(prompt)
+            if key in self._tasks:
+                continue
+            print(f"🔮 Prefetching RAG results for: '{prompt}'")
+            self._tasks[key] = asyncio.create_task(self.search(prompt, None))
+            self._speculated = True
+            PREFETCH_STATS["launched"] += 1
+
+    async def take(self, prompt: str, rag_filter=None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Claim prefetched results for a prompt.
+
+        Args:
+            prompt: RAG prompt from the validator
+            rag_filter: The validator's filter; prefetches ran unfiltered, so any
+                filter values make them unusable
+
+        Returns:
+            The prefetched results, or None if the prompt must be searched normally
+        """
+        key = _prompt_key(prompt)
+        if key not in self._tasks:
+            if self._speculated:
+                PREFETCH_STATS["miss"] += 1
+            return None
+        if _has_filter_values(rag_filter):
+            PREFETCH_STATS["filtered"] += 1
+            return None
+
+        task = self._tasks.pop(key)
+        try:
+            results = await task
+        except Exception as e:
+            print(f"❌ Prefetched RAG search failed: {str(e)}")
+            PREFETCH_STATS["error"] += 1
+            return None
+        print(f"✅ Using prefetched RAG results for: '{prompt}'")
+        PREFETCH_STATS["hit"] += 1
+        return results
+
+    def discard(self) -> None:
+        """Cancel or drop every prefetch that was not used."""
+        for task in self._tasks.values():
+            PREFETCH_STATS["wasted"] += 1
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                # Retrieve the exception so it is not reported as never retrieved
+                task.exception()
+        self._tasks.clear()
+
+def format_prefetch_stats() -> str:
+    """Summarise prefetch hit rate and wasted work."""
+    launched = PREFETCH_STATS["launched"]
+    hits = PREFETCH_STATS["hit"]
+    lookups = hits + PREFETCH_STATS["miss"] + PREFETCH_STATS["filtered"]
+    hit_rate = hits / lookups if lookups else 0.0
+    return (f"launched {launched}, hits {hits}, misses {PREFETCH_STATS['miss']}, "
+            f"unusable (filtered) {PREFETCH_STATS['filtered']}, wasted {PREFETCH_STATS['wasted']}, "
+            f"errors {PREFETCH_STATS['error']}, hit rate {hit_rate:.0%}")
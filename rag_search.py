@@ -1,24 +1,59 @@
+import asyncio
 import requests
 import warnings
 import numpy as np
-from typing import List, Dict, Any, Optional
-from qdrant_client import QdrantClient
-from qdrant_client.http.models import Filter, FieldCondition, MatchAny
-from config import MOVIES_LIST
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, TYPE_CHECKING
+from clients import get_qdrant_client
+from config import (RAG_COLLECTION_NAME, OLLAMA_URL, EMBEDDING_MODEL, EMBEDDING_DIM,
+                    EMBEDDING_TIMEOUT_S, RAG_RESULT_LIMIT, RRF_K,
+                    RAG_KEYWORD_MAX_TERMS, RAG_KEYWORD_MIN_HITS)
+from entity_cache import get_entity_lists, normalize_entity
+
+if TYPE_CHECKING:
+    from qdrant_client.http.models import Filter
 
 # Suppress warnings
 warnings.filterwarnings("ignore")
 
-# Initialize Qdrant client
-qdrant_client = QdrantClient("http://localhost:6333/dashboard")
-COLLECTION_NAME = "rag_movies"
+COLLECTION_NAME = RAG_COLLECTION_NAME
+
+# Bookkeeping fields written by the ingestion job; never sent to the LLM
+INTERNAL_PAYLOAD_KEYS = ["plot_hash", "payload_hash"]
+
+@lru_cache(maxsize=None)
+def rag_payload_selector():
+    """Payload selector that leaves out the bookkeeping fields (qdrant_client is imported on first use)."""
+    from qdrant_client.http.models import PayloadSelectorExclude
+    return PayloadSelectorExclude(exclude=INTERNAL_PAYLOAD_KEYS)
+
+def build_movie_payload(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build the Qdrant payload for a movie row.
+    
+    Args:
+        record: Row with id, title, year, imdb_rating, plot, actors, genres and languages
+        
+    Returns:
+        Payload with the keys search_rag_movies filters on
+    """
+    return {
+        "Title": record["title"],
+        "Year": record["year"],
+        "ImdbRating": record["imdb_rating"],
+        "Genre": list(record["genres"] or []),
+        "Actors": list(record["actors"] or []),
+        "Languages": list(record["languages"] or []),
+        "Plot": record["plot"],
+    }
 
-def get_embedding(text: str) -> np.ndarray:
+def get_embedding(text: str, timeout: Optional[float] = None) -> np.ndarray:
     """
     Get embeddings for a text string using local MX Bai server.
     
     Args:
         text: Text to embed
+        timeout: Optional request timeout in seconds
         
     Returns:
         Normalized embedding vector
@@ -26,13 +61,33 @@ def get_embedding(text: str) -> np.ndarray:
     print(f"🧠 Generating embedding for: '{text[:50]}...'")
     
     response = requests.post(
-        "http://localhost:11434/api/embeddings",
-        json={"model": "mxbai-embed-large:latest", "prompt": text}
+        f"{OLLAMA_URL}/api/embeddings",
+        json={"model": EMBEDDING_MODEL, "prompt": text},
+        timeout=timeout
     )
     vector = np.array(response.json()['embedding'])
     vector = vector / np.linalg.norm(vector)
     return vector
 
+def get_embeddings(texts: List[str]) -> List[List[float]]:
+    """
+    Get embeddings for a batch of texts in a single request.
+    
+    Args:
+        texts: Texts to embed
+        
+    Returns:
+        Normalized embedding vectors, in input order
+    """
+    response = requests.post(
+        f"{OLLAMA_URL}/api/embed",
+        json={"model": EMBEDDING_MODEL, "input": texts}
+    )
+    response.raise_for_status()
+    vectors = np.array(response.json()['embeddings'])
+    vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.tolist()
+
 def get_embedding_by_title(title: str) -> Optional[List[float]]:
     """
     Get embedding vector for a movie by its title.
@@ -57,9 +112,9 @@ def get_embedding_by_title(title: str) -> Optional[List[float]]:
     }
 
     # Perform search with a dummy query_vector (zero vector)
-    dummy_vector = [0.0] * 1024
+    dummy_vector = [0.0] * EMBEDDING_DIM
 
-    response = qdrant_client.search(
+    response = get_qdrant_client().search(
         collection_name=COLLECTION_NAME,
         query_vector=dummy_vector,
         query_filter=query_filter,
@@ -75,6 +130,38 @@ def get_embedding_by_title(title: str) -> Optional[List[float]]:
         print(f"❌ No embedding found for movie: '{title}'")
         return None
 
+def build_qdrant_filter(filter=None) -> Optional["Filter"]:
+    """
+    Convert a RAGFilter into a Qdrant Filter.
+    
+    Args:
+        filter: Optional RAGFilter with Title/Genre/Year/Actors/ImdbRating values
+        
+    Returns:
+        Qdrant Filter, or None if no filter values are set
+    """
+    if not filter:
+        return None
+    from qdrant_client.http.models import Filter, FieldCondition, MatchAny
+    
+    print(f"🔍 Applying filters to RAG search")
+    must_conditions = []
+    
+    # Process all filters
+    for filter_type in ['Title', 'Genre', 'Year', 'Actors', 'ImdbRating']:
+        filter_values = getattr(filter, filter_type, None)
+        if filter_values:
+            print(f"  - {filter_type} filter: {', '.join(filter_values)}")
+            must_conditions.append(
+                FieldCondition(
+                    key=filter_type,
+                    match=MatchAny(any=[value.lower() for value in filter_values])
+                )
+            )
+    
+    # Only create a query_filter if we have conditions
+    return Filter(must=must_conditions) if must_conditions else None
+
 def search_rag_movies(query: str, filter=None) -> List[Dict[str, Any]]:
     """
     Search for movies in the RAG database.
@@ -94,19 +181,21 @@ def search_rag_movies(query: str, filter=None) -> List[Dict[str, Any]]:
     query_vector = None
     movie_plot = []
 
-    # Check if query is a known movie title
-    if query in set(MOVIES_LIST):
+    # Check if query is a known movie title (or an alias of one)
+    entity_lists = get_entity_lists()
+    query = entity_lists.movie_aliases.get(normalize_entity(query), query)
+    if normalize_entity(query) in entity_lists.movie_keys:
         print(f"✅ Query matches known movie title: '{query}'")
         query_vector = get_embedding_by_title(query)
         is_movie = True
         
         # Get the movie's plot summary
         if query_vector:
-            movie_plot_results = qdrant_client.search(
+            movie_plot_results = get_qdrant_client().search(
                 collection_name=COLLECTION_NAME,
                 query_vector=query_vector,
                 limit=1,
-                with_payload=True
+                with_payload=rag_payload_selector()
             )
             
             if movie_plot_results:
@@ -118,38 +207,17 @@ def search_rag_movies(query: str, filter=None) -> List[Dict[str, Any]]:
         print("🧠 Generating embedding from query text")
         query_vector = get_embedding(query)
     
-    # Initialize query_filter as None
-    query_filter = None
-    
-    # If filter is provided, create a dynamic Qdrant Filter object
-    if filter:
-        print(f"🔍 Applying filters to RAG search")
-        must_conditions = []
-        
-        # Process all filters
-        for filter_type in ['Title', 'Genre', 'Year', 'Actors', 'ImdbRating']:
-            filter_values = getattr(filter, filter_type, None)
-            if filter_values:
-                print(f"  - {filter_type} filter: {', '.join(filter_values)}")
-                must_conditions.append(
-                    FieldCondition(
-                        key=filter_type,
-                        match=MatchAny(any=[value.lower() for value in filter_values])
-                    )
-                )
-        
-        # Only create a query_filter if we have conditions
-        if must_conditions:
-            query_filter = Filter(must=must_conditions)
+    # Create a dynamic Qdrant Filter object if a filter is provided
+    query_filter = build_qdrant_filter(filter)
     
     # Execute the search with the constructed filter
     print("🔍 Executing vector search")
-    response = qdrant_client.search(
+    response = get_qdrant_client().search(
         collection_name=COLLECTION_NAME,
         query_vector=query_vector,
         query_filter=query_filter,
-        limit=10,
-        with_payload=True
+        limit=RAG_RESULT_LIMIT,
+        with_payload=rag_payload_selector()
     )
     
     results = [x.payload for x in response] if response else []
@@ -161,4 +229,185 @@ def search_rag_movies(query: str, filter=None) -> List[Dict[str, Any]]:
         print(f"✅ Final results: {len(final_results)} items (including movie plot)")
         return final_results
     
-    return results
\ No newline at end of file
+    return results
+
+# Payload columns of a movie row (alias m), read from the base tables
+MOVIE_PAYLOAD_COLUMNS = """m.id, m.title, m.year, m.imdb_rating, m.plot,
+       ARRAY(SELECT a.name FROM movie_actors ma JOIN actors a ON a.id = ma.actor_id
+             WHERE ma.movie_id = m.id ORDER BY a.name) AS actors,
+       ARRAY(SELECT g.name FROM movie_genres mg JOIN genres g ON g.id = mg.genre_id
+             WHERE mg.movie_id = m.id ORDER BY g.name) AS genres,
+       ARRAY(SELECT l.name FROM movie_languages ml JOIN languages l ON l.id = ml.language_id
+             WHERE ml.movie_id = m.id ORDER BY l.name) AS languages"""
+
+# Full-text search over the precomputed movies.search_tsv column. Terms are
+# OR-ed so plot phrases match partially; ts_rank_cd orders by coverage. It reads
+# the base tables rather than movie_search, so new movies are found before the
+# materialized view is refreshed, and builds payloads only for the top hits.
+KEYWORD_SEARCH_QUERY = """
+WITH q AS (
+    SELECT replace(plainto_tsquery('english', $1)::text, ' & ', ' | ')::tsquery AS query
+),
+ranked AS (
+    SELECT m.id, ts_rank_cd(m.search_tsv, q.query) AS rank
+    FROM q, movies m
+    WHERE m.search_tsv @@ q.query {filters}
+    ORDER BY rank DESC
+    LIMIT $2
+)
+SELECT """ + MOVIE_PAYLOAD_COLUMNS + """, r.rank
+FROM ranked r
+JOIN movies m ON m.id = r.id
+ORDER BY r.rank DESC
+"""
+
+# RAGFilter field -> SQL condition on movies m (same semantics as Qdrant MatchAny)
+KEYWORD_FILTER_CONDITIONS = {
+    "Title": "m.title = ANY(${})",
+    "Genre": ("EXISTS (SELECT 1 FROM movie_genres mg JOIN genres g ON g.id = mg.genre_id "
+              "WHERE mg.movie_id = m.id AND g.name = ANY(${}))"),
+    "Year": "m.year = ANY(${})",
+    "Actors": ("EXISTS (SELECT 1 FROM movie_actors ma JOIN actors a ON a.id = ma.actor_id "
+               "WHERE ma.movie_id = m.id AND a.name = ANY(${}))"),
+    "ImdbRating": "m.imdb_rating = ANY(${})",
+}
+
+def movie_key(payload: Dict[str, Any]) -> str:
+    """
+    Identity of a movie payload across retrieval methods.
+
+    Titles are not unique (Don 1978 and Don 2006), so the year is part of the key.
+    """
+    return f"{normalize_entity(str(payload.get('Title', '')))}|{normalize_entity(str(payload.get('Year', '')))}"
+
+async def keyword_search_movies(pool, query: str, filter=None,
+                                limit: int = RAG_RESULT_LIMIT) -> List[Dict[str, Any]]:
+    """
+    Search movie titles and plots with Postgres full-text search.
+    
+    Args:
+        pool: Database connection pool
+        query: Search phrase
+        filter: Optional RAGFilter
+        limit: Maximum number of results
+        
+    Returns:
+        Movie payloads in the same shape as the vector search, best match first
+    """
+    params = [query, limit]
+    conditions = []
+    for filter_type, condition in KEYWORD_FILTER_CONDITIONS.items():
+        filter_values = getattr(filter, filter_type, None) if filter else None
+        if filter_values:
+            params.append([value.lower() for value in filter_values])
+            conditions.append(condition.format(len(params)))
+    filters = "".join(f" AND {condition}" for condition in conditions)
+    
+    print(f"🔍 Executing keyword search for: '{query}'")
+    async with pool.acquire() as connection:
+        rows = await connection.fetch(KEYWORD_SEARCH_QUERY.format(filters=filters), *params)
+    
+    results = [build_movie_payload(row) for row in rows]
+    print(f"✅ Keyword search found {len(results)} results")
+    return results
+
+async def _keyword_search_or_empty(pool, query: str, filter=None) -> List[Dict[str, Any]]:
+    try:
+        return await keyword_search_movies(pool, query, filter)
+    except Exception as e:
+        print(f"❌ Keyword search failed: {str(e)}")
+        return []
+
+def reciprocal_rank_fusion(rankings: List[List[Dict[str, Any]]],
+                           k: int = RRF_K) -> List[Dict[str, Any]]:
+    """
+    Fuse ranked result lists with reciprocal rank fusion.
+    
+    Args:
+        rankings: Result lists, each ordered best first
+        k: RRF damping constant
+        
+    Returns:
+        Deduplicated payloads ordered by fused score
+    """
+    scores = {}
+    payloads = {}
+    for ranking in rankings:
+        for rank, payload in enumerate(ranking):
+            key = movie_key(payload)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank + 1)
+            payloads.setdefault(key, payload)
+    return [payloads[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+def vector_search_text(query: str, filter=None, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    Embed a free-text query and run the vector search.
+    
+    Args:
+        query: Search phrase
+        filter: Optional RAGFilter
+        timeout: Embedding request timeout in seconds
+        
+    Returns:
+        Movie payloads, best match first
+    """
+    query_vector = get_embedding(query.lower(), timeout=timeout)
+    response = get_qdrant_client().search(
+        collection_name=COLLECTION_NAME,
+        query_vector=query_vector,
+        query_filter=build_qdrant_filter(filter),
+        limit=RAG_RESULT_LIMIT,
+        with_payload=rag_payload_selector()
+    )
+    return [x.payload for x in response] if response else []
+
+async def hybrid_search_rag_movies(query: str, filter=None, pool=None) -> List[Dict[str, Any]]:
+    """
+    Search movies with full-text and vector retrieval and fuse the rankings.
+    
+    Known titles keep the title-vector similarity path. Short keyword prompts
+    run full-text search first and skip the embedding entirely when it finds
+    enough hits; longer prompts start the embedding + vector search first so
+    it overlaps the full-text search. Full-text results are used on their own
+    if the embedding service is slow or unavailable.
+    
+    Args:
+        query: Search query (movie title or description)
+        filter: Optional filter to narrow search results
+        pool: Database connection pool; without one only the vector search runs
+        
+    Returns:
+        List of movie data matching the query
+    """
+    entity_lists = get_entity_lists()
+    title = entity_lists.movie_aliases.get(normalize_entity(query), normalize_entity(query))
+    if pool is None or title in entity_lists.movie_keys:
+        return await asyncio.to_thread(search_rag_movies, query, filter)
+    
+    print(f"🔍 Performing hybrid RAG search for: '{query}'")
+    
+    def start_vector_search():
+        return asyncio.create_task(
+            asyncio.to_thread(vector_search_text, query, filter, EMBEDDING_TIMEOUT_S))
+    
+    if len(query.split()) <= RAG_KEYWORD_MAX_TERMS:
+        # Keyword-heavy prompts: full-text first, and no embedding request if it finds enough
+        keyword_results = await _keyword_search_or_empty(pool, query, filter)
+        if len(keyword_results) >= RAG_KEYWORD_MIN_HITS:
+            print("✅ Answered from keyword search alone")
+            return keyword_results
+        vector_task = start_vector_search()
+    else:
+        # Descriptive prompts need the vectors: start them first so they overlap the keyword search
+        vector_task = start_vector_search()
+        keyword_results = await _keyword_search_or_empty(pool, query, filter)
+    
+    try:
+        vector_results = await vector_task
+    except Exception as e:
+        print(f"⚠️ Vector search unavailable ({str(e)}), using keyword results only")
+        return keyword_results
+    
+    fused = reciprocal_rank_fusion([vector_results, keyword_results])[:RAG_RESULT_LIMIT]
+    print(f"✅ Hybrid search fused {len(vector_results)} vector + {len(keyword_results)} keyword results into {len(fused)}")
+    return fused
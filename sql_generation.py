@@ -1,34 +1,42 @@
 from typing import List, Optional, Dict, Any
-from google import genai
 from google.genai import types
-from config import GEMINI_API_KEY
+from config import PRIMARY_MODEL, FAST_MODEL, SQL_ROW_LIMIT
+from llm_calls import TurnBudget, generate_content, mark_degraded
 from models import SQLResponse
 
-# Initialize Google Generative AI client
-client = genai.Client(api_key=GEMINI_API_KEY)
-
 # System instruction for Gemini model
-SYSTEM_INSTRUCTION_SQL = """You are a specialized SQL query generator for a movie database. Your task is to convert natural language questions into correct PostgreSQL queries.
+SYSTEM_INSTRUCTION_SQL = f"""You are a specialized SQL query generator for a movie database. Your task is to convert natural language questions into correct PostgreSQL queries.
 
 DATABASE SCHEMA:
-- movies (id, title, year, imdb_rating, plot)
+- movies (id, title, year, imdb_rating, plot, year_num, imdb_rating_num)
 - actors (id, name)
 - genres (id, name) 
 - languages (id, name)
 - movie_actors (movie_id, actor_id)
 - movie_genres (movie_id, genre_id)
 - movie_languages (movie_id, language_id)
+- movie_search (id, title, year, year_num, imdb_rating, imdb_rating_num, plot, actors TEXT[], genres TEXT[], languages TEXT[])
+  A denormalized view with one row per movie and its actor, genre and language names pre-joined into arrays.
 
 KEY RELATIONSHIPS:
 - movies have many actors through movie_actors
 - movies have many genres through movie_genres
 - movies have many languages through movie_languages
+- movie_search.id = movies.id
+
+PREFER movie_search FOR MOVIE LOOKUPS:
+- Questions that filter or list movies by actor, genre, language, year, rating or title should query movie_search alone, without joins
+- Filter arrays with the indexed containment operators: ms.actors @> ARRAY['shah rukh khan'] (all of), ms.genres && ARRAY['action', 'thriller'] (any of)
+- Do not use = ANY(...) or unnest() in filters, as they cannot use the array indexes
+- Use the base tables only when you need per-actor/genre/language aggregates (e.g. counting movies per actor)
 
 DATA SPECIFICATIONS:
 - ALL TEXT in database is stored in lowercase (titles, actor names, genres, plot, languages)
-- 'year' and 'imdb_rating' are stored as TEXT
+- 'year' and 'imdb_rating' are stored as TEXT; use them only for display
+- 'year_num' (INTEGER) and 'imdb_rating_num' (NUMERIC) are indexed typed copies of year and imdb_rating, NULL where data is missing
+- ALWAYS use m.year_num and m.imdb_rating_num for filtering, comparing and sorting by year or rating (e.g. m.imdb_rating_num > 8, m.year_num BETWEEN 2015 AND 2020); never cast the TEXT columns
 - Missing data is stored as "N/A" (imdb_rating, year) or "n/a" (other fields)
-- For numeric comparisons, cast imdb_rating to NUMERIC using NULLIF(m.imdb_rating, 'N/A')::NUMERIC
+- movies.title, movies.plot and actors.name have trigram indexes, so LIKE '%term%' searches on them are fast; compare against lowercase literals directly instead of wrapping columns in LOWER()
 
 ADVANCED PROCESSING GUIDELINES:
 1. Previous Answers: If the answer is available from past conversation, include that in the reason field and set is_completed to True without generating new queries.
@@ -61,13 +69,16 @@ RESPONSE REQUIREMENTS:
 7. Only respond to movie-related queries (greetings and farewells are acceptable)
 8. Never give insert, update, delete, drop, or truncate queries
 9. If in past conversations, you can find direct answer to user query, include that in the reason field and set is_completed to True
+10. Each query must be a single SELECT statement. Queries run read-only, are capped at {SQL_ROW_LIMIT} rows and are rejected if their estimated cost is too high, so always join on keys and filter as selectively as possible
 """
 
 async def get_sql_from_gemini(question: str, 
                              extracted_movies: Optional[List[str]] = None, 
                              extracted_actors: Optional[List[str]] = None, 
                              task: Optional[str] = None, 
-                             conversation_history: List = None) -> Dict[str, Any]:
+                             conversation_history: List = None,
+                             budget: Optional[TurnBudget] = None,
+                             feedback: Optional[List[str]] = None) -> Dict[str, Any]:
     """
     Convert natural language question to SQL using Gemini API,
     with additional context from extracted entities and task.
@@ -78,6 +89,8 @@ async def get_sql_from_gemini(question: str,
         extracted_actors: List of corrected actor names after fuzzy matching
         task: Extracted user intent/task
         conversation_history: List of conversation messages
+        budget: Optional latency budget for the current turn
+        feedback: Reasons previous queries were rejected or failed, for a retry
         
     Returns:
         SQL response object as a dictionary
@@ -108,20 +121,30 @@ async def get_sql_from_gemini(question: str,
                 
             enhanced_prompt += "\nNote: These are fuzzy-matched and corrected names. Please use these names in your SQL query where applicable, as they match the database records."
         
+        # Explain why the previous attempt was rejected so the model can fix it
+        if feedback:
+            enhanced_prompt += "\n\n### Previous SQL Rejected ###\n"
+            enhanced_prompt += "\n".join(feedback)
+            enhanced_prompt += "\nRewrite the SQL queries to fix these problems. Queries must be single read-only SELECT statements with selective filters and proper join conditions."
+        
         user_message = types.Content(
             role="user",
             parts=[types.Part.from_text(text=enhanced_prompt)],
         )
         conversation_history.append(user_message)
 
-        response = client.models.generate_content(
-            model="gemini-2.5-flash-preview-04-17",
+        response = await generate_content(
+            "sql_generation",
+            model=PRIMARY_MODEL,
             config=types.GenerateContentConfig(
                 system_instruction=SYSTEM_INSTRUCTION_SQL,
                 temperature=0.1,
                 response_schema=SQLResponse,
                 response_mime_type="application/json"),
-            contents=conversation_history
+            contents=conversation_history,
+            budget=budget,
+            fallback_model=FAST_MODEL,
+            cache_prompt=True
         )
         
         # Extract SQL from response
@@ -131,4 +154,5 @@ async def get_sql_from_gemini(question: str,
     
     except Exception as e:
         print(f"❌ Error generating SQL: {str(e)}")
+        mark_degraded(budget, "sql_generation", e)
         return {"sql_queries": [], "reason": f"Error: {str(e)}", "is_completed": False}
\ No newline at end of file
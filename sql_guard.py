@@ -0,0 +1,161 @@
+import re
+import json
+from typing import List, Dict, Any
+from config import SQL_ROW_LIMIT, SQL_MAX_PLAN_COST, SQL_MAX_PLAN_ROWS, SQL_STATEMENT_TIMEOUT_MS
+
+# Keywords that never belong in a read-only lookup, checked outside literals
+FORBIDDEN_KEYWORDS = {
+    "insert", "update", "delete", "merge", "drop", "alter", "truncate", "create",
+    "grant", "revoke", "copy", "call", "do", "vacuum", "reindex", "cluster",
+    "refresh", "lock", "listen", "notify", "set", "reset", "into",
+}
+FORBIDDEN_FUNCTIONS = {
+    "pg_sleep", "pg_terminate_backend", "pg_cancel_backend", "pg_read_file",
+    "pg_read_binary_file", "pg_ls_dir", "lo_import", "lo_export", "dblink",
+}
+
+_LITERAL_PATTERN = re.compile(
+    r"'(?:[^']|'')*'"              # string literals
+    r"|\"(?:[^\"]|\"\")*\""        # quoted identifiers
+    r"|\$([A-Za-z_]*)\$.*?\$\1\$"  # dollar-quoted strings
+    r"|--[^\n]*"                   # line comments
+    r"|/\*.*?\*/",                 # block comments
+    re.DOTALL,
+)
+_WORD_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+# Row counts must be plain numbers so "LIMIT 10 * 1000" cannot slip past the cap
+_LIMIT_VALUE_PATTERN = re.compile(r"\blimit\s+(\d+|all)(?=\s*$|\s+(?:offset|fetch|for)\b)", re.IGNORECASE)
+_FETCH_VALUE_PATTERN = re.compile(
+    r"\bfetch\s+(?:first|next)\s+(?:(\d+)\s+)?rows?\s+(?:only|with\s+ties)\b", re.IGNORECASE
+)
+
+class SQLGuardError(Exception):
+    """Raised when a generated query is rejected by the guard."""
+
+def _mask(sql: str) -> str:
+    """Blank out literals and comments (keeping offsets) so keywords can be scanned safely."""
+    return _LITERAL_PATTERN.sub(lambda m: " " * len(m.group(0)), sql)
+
+def _top_level_words(masked: str) -> List[tuple]:
+    """Return (word, start, end) for words outside any parentheses."""
+    words = []
+    depth = 0
+    for match in re.finditer(r"[()]|[A-Za-z_][A-Za-z0-9_]*", masked):
+        token = match.group(0)
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+        elif depth == 0:
+            words.append((token.lower(), match.start(), match.end()))
+    return words
+
+def validate_statement(sql: str) -> str:
+    """
+    Check that a generated query is a single read-only SELECT.
+
+    Args:
+        sql: Query text from the SQL generator
+
+    Returns:
+        The statement without a trailing semicolon
+
+    Raises:
+        SQLGuardError: If the statement is empty, stacked or not read-only
+    """
+    statement = sql.strip().rstrip(";").strip()
+    masked = _mask(statement)
+    if not masked.strip():
+        raise SQLGuardError("empty query")
+    if ";" in masked:
+        raise SQLGuardError("multiple statements are not allowed; send one query per entry")
+
+    words = [word.lower() for word in _WORD_PATTERN.findall(masked)]
+    if words[0] not in ("select", "with"):
+        raise SQLGuardError("only SELECT queries are allowed")
+    forbidden = sorted(set(words) & FORBIDDEN_KEYWORDS)
+    if forbidden:
+        raise SQLGuardError(f"forbidden keyword(s): {', '.join(forbidden).upper()}")
+    functions = sorted(set(words) & FORBIDDEN_FUNCTIONS)
+    if functions:
+        raise SQLGuardError(f"forbidden function(s): {', '.join(functions)}")
+    return statement
+
+def enforce_row_limit(statement: str, row_limit: int = SQL_ROW_LIMIT) -> str:
+    """
+    Append a LIMIT when the top-level query has none, and cap larger LIMIT or
+    FETCH FIRST counts.
+
+    Args:
+        statement: Validated SELECT statement
+        row_limit: Maximum rows to return
+
+    Returns:
+        Statement with a bounded row count
+
+    Raises:
+        SQLGuardError: If the top-level LIMIT/FETCH count is not a plain number
+    """
+    masked = _mask(statement)
+    top_level = _top_level_words(masked)
+    limit_positions = [start for word, start, _ in top_level if word == "limit"]
+    fetch_positions = [start for word, start, _ in top_level if word == "fetch"]
+    if not limit_positions and not fetch_positions:
+        return f"{statement}\nLIMIT {row_limit}"
+
+    if limit_positions:
+        match = _LIMIT_VALUE_PATTERN.match(masked, limit_positions[-1])
+        if not match:
+            raise SQLGuardError(f"LIMIT must be a plain row count of at most {row_limit}")
+        if match.group(1).lower() == "all" or int(match.group(1)) > row_limit:
+            return f"{statement[:match.start(1)]}{row_limit}{statement[match.end(1):]}"
+        return statement
+
+    match = _FETCH_VALUE_PATTERN.match(masked, fetch_positions[-1])
+    if not match:
+        raise SQLGuardError(f"FETCH FIRST must use a plain row count of at most {row_limit}")
+    if match.group(1) is not None and int(match.group(1)) > row_limit:
+        return f"{statement[:match.start(1)]}{row_limit}{statement[match.end(1):]}"
+    return statement
+
+def _max_plan_rows(plan: Dict[str, Any]) -> float:
+    """Largest row estimate of any node in the plan tree."""
+    return max([plan.get("Plan Rows", 0)] + [_max_plan_rows(child) for child in plan.get("Plans", [])])
+
+async def guarded_fetch(connection, sql: str) -> List[Any]:
+    """
+    Run a generated query inside a read-only transaction after checking its plan.
+
+    Args:
+        connection: asyncpg connection
+        sql: Query text from the SQL generator
+
+    Returns:
+        Result rows
+
+    Raises:
+        SQLGuardError: If the query is not read-only or its plan is too expensive
+    """
+    statement = enforce_row_limit(validate_statement(sql))
+
+    async with connection.transaction(readonly=True):
+        await connection.execute(f"SET LOCAL statement_timeout = {int(SQL_STATEMENT_TIMEOUT_MS)}")
+
+        plan = await connection.fetchval(f"EXPLAIN (FORMAT JSON) {statement}")
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        root = plan[0]["Plan"]
+        cost = root.get("Total Cost", 0)
+        if cost > SQL_MAX_PLAN_COST:
+            raise SQLGuardError(
+                f"estimated cost {cost:.0f} exceeds the limit of {SQL_MAX_PLAN_COST:.0f}; "
+                "add selective filters and avoid cross joins or unbounded sorts"
+            )
+        rows = _max_plan_rows(root)
+        if rows > SQL_MAX_PLAN_ROWS:
+            raise SQLGuardError(
+                f"plan produces an estimated {rows:.0f} intermediate rows (limit {SQL_MAX_PLAN_ROWS}); "
+                "check join conditions"
+            )
+
+        return await connection.fetch(statement)
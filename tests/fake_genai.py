@@ -0,0 +1,54 @@
+"""Local stand-in for the Gemini API used by the LLM-call tests."""
+import asyncio
+from types import SimpleNamespace
+from google.genai import errors
+
+class FakeGenaiClient:
+    """Local stand-in for the Gemini API: records calls and serves cached contents."""
+
+    def __init__(self, create_delay: float = 0.0, fail_create: bool = False,
+                 generate_delays=(), generate_errors=()):
+        self.create_delay = create_delay
+        self.fail_create = fail_create
+        # Per-call delay and error for generate_content, consumed in call order
+        self.generate_delays = list(generate_delays)
+        self.generate_errors = list(generate_errors)
+        self.created = []
+        self.updated = []
+        self.deleted = []
+        self.generated = []
+        self.started = []
+        self.live_caches = set()
+        self.aio = SimpleNamespace(
+            caches=SimpleNamespace(create=self._create, update=self._update, delete=self._delete),
+            models=SimpleNamespace(generate_content=self._generate_content),
+        )
+
+    async def _create(self, model, config):
+        await asyncio.sleep(self.create_delay)
+        if self.fail_create:
+            raise errors.ClientError(400, {"error": {"message": "Cached content is too small", "status": "INVALID_ARGUMENT"}})
+        name = f"cachedContents/{len(self.created) + 1}"
+        self.created.append((model, config))
+        self.live_caches.add(name)
+        return SimpleNamespace(name=name)
+
+    async def _update(self, name, config):
+        self.updated.append((name, config.ttl))
+
+    async def _delete(self, name):
+        self.deleted.append(name)
+        self.live_caches.discard(name)
+
+    async def _generate_content(self, model, config, contents):
+        call = len(self.started)
+        self.started.append(model)
+        if call < len(self.generate_delays):
+            await asyncio.sleep(self.generate_delays[call])
+        if call < len(self.generate_errors) and self.generate_errors[call] is not None:
+            raise self.generate_errors[call]
+        cache_name = getattr(config, "cached_content", None)
+        if cache_name is not None and cache_name not in self.live_caches:
+            raise errors.ClientError(404, {"error": {"message": "CachedContent not found", "status": "NOT_FOUND"}})
+        self.generated.append((cache_name, getattr(config, "system_instruction", None), list(contents)))
+        return SimpleNamespace(text=f"answer {call}", model=model)
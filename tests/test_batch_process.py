@@ -0,0 +1,63 @@
+import json
+import asyncio
+import pytest
+import batch_process
+from batch_process import percentile, read_completed_ids, read_questions
+from llm_calls import mark_degraded
+
+@pytest.mark.parametrize("values, fraction, expected", [
+    ([1, 2, 3, 4, 5], 0.5, 3),
+    ([1, 2, 3, 4, 5], 0.9, 5),
+    ([1, 2, 3, 4, 5, 6, 7, 8, 9], 0.5, 5),
+    ([1, 2, 3, 4], 0.5, 2),
+    ([1, 2, 3, 4], 0.99, 4),
+    ([7], 0.5, 7),
+    ([], 0.5, 0.0),
+])
+def test_percentile_is_nearest_rank(values, fraction, expected):
+    assert percentile(values, fraction) == expected
+
+def test_completed_ids_skip_failed_and_truncated_records(tmp_path):
+    output = tmp_path / "answers.jsonl"
+    output.write_text("\n".join([
+        json.dumps({"id": "1", "answer": "ok"}),
+        json.dumps({"id": "2", "answer": None, "error": "timeout"}),
+        json.dumps({"id": "3", "answer": None}),
+        json.dumps({"id": 4, "answer": "ok"}),
+        '{"id": "5", "answ',
+    ]), encoding="utf-8")
+    assert read_completed_ids(str(output)) == {"1", "4"}
+
+def test_completed_ids_of_missing_file_is_empty(tmp_path):
+    assert read_completed_ids(str(tmp_path / "missing.jsonl")) == set()
+
+def test_read_questions_skips_malformed_lines(tmp_path, capsys):
+    questions = tmp_path / "questions.jsonl"
+    questions.write_text("\n".join([
+        json.dumps({"id": "a", "question": "who directed sholay?"}),
+        "{not json",
+        json.dumps({"id": "b"}),
+        "[1, 2]",
+        "",
+        json.dumps({"question": "best movies of 2001"}),
+    ]), encoding="utf-8")
+    assert list(read_questions(str(questions))) == [("a", "who directed sholay?"), ("6", "best movies of 2001")]
+    assert capsys.readouterr().err.count("Skipping line") == 3
+
+def test_degraded_turn_is_recorded_as_error(monkeypatch):
+    async def degraded_turn(question, conversation_history, budget):
+        mark_degraded(budget, "validation", "deadline exceeded")
+        return "I'm sorry, I couldn't answer that in time. Please try again."
+
+    monkeypatch.setattr(batch_process, "process_user_query", degraded_turn)
+    record = asyncio.run(batch_process.answer_question("1", "question"))
+    assert record["error"] == "degraded: validation: deadline exceeded"
+    assert record["answer"].startswith("I'm sorry")
+
+def test_clean_turn_has_no_error(monkeypatch):
+    async def clean_turn(question, conversation_history, budget):
+        return "Ramesh Sippy"
+
+    monkeypatch.setattr(batch_process, "process_user_query", clean_turn)
+    record = asyncio.run(batch_process.answer_question("1", "question"))
+    assert "error" not in record and record["answer"] == "Ramesh Sippy"
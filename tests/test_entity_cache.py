@@ -0,0 +1,64 @@
+from entity_cache import CACHE_MAGIC, read_entity_cache, write_entity_cache
+
+FINGERPRINT = b'[["movies.json", 1, 2]]'
+SECTIONS = {
+    "movies": ["don", "devdas", "agneepath"],
+    "actors": ["amitabh bachchan", "shah rukh khan", "hrithik roshan"],
+    "movie_alias_keys": ["ddlj"],
+    "movie_alias_values": ["dilwale dulhania le jayenge"],
+    "empty": [],
+    "unicode": ["amélie", "crouching tiger, 卧虎藏龙", ""],
+}
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "entity_lists.bin")
+    write_entity_cache(path, FINGERPRINT, SECTIONS)
+    assert read_entity_cache(path, FINGERPRINT) == SECTIONS
+
+def test_read_without_fingerprint_check(tmp_path):
+    path = str(tmp_path / "entity_lists.bin")
+    write_entity_cache(path, FINGERPRINT, SECTIONS)
+    assert read_entity_cache(path) == SECTIONS
+
+def test_stale_fingerprint_is_a_miss(tmp_path):
+    path = str(tmp_path / "entity_lists.bin")
+    write_entity_cache(path, FINGERPRINT, SECTIONS)
+    assert read_entity_cache(path, b'[["movies.json", 3, 4]]') is None
+
+def test_missing_file_is_a_miss(tmp_path):
+    assert read_entity_cache(str(tmp_path / "missing.bin"), FINGERPRINT) is None
+
+def test_wrong_magic_is_a_miss(tmp_path):
+    path = tmp_path / "entity_lists.bin"
+    write_entity_cache(str(path), FINGERPRINT, SECTIONS)
+    data = path.read_bytes()
+    path.write_bytes(b"XXXXXXXX" + data[len(CACHE_MAGIC):])
+    assert read_entity_cache(str(path), FINGERPRINT) is None
+
+def test_truncated_file_is_a_miss(tmp_path):
+    path = tmp_path / "entity_lists.bin"
+    write_entity_cache(str(path), FINGERPRINT, SECTIONS)
+    data = path.read_bytes()
+    for length in (0, len(CACHE_MAGIC) + 2, len(data) // 2, len(data) - 1):
+        path.write_bytes(data[:length])
+        assert read_entity_cache(str(path), FINGERPRINT) is None, length
+
+def test_truncation_that_keeps_the_value_count_is_a_miss(tmp_path):
+    path = tmp_path / "entity_lists.bin"
+    write_entity_cache(str(path), FINGERPRINT, {"movies": ["don", "devdas"]})
+    data = path.read_bytes()
+    path.write_bytes(data[:-2])
+    assert read_entity_cache(str(path), FINGERPRINT) is None
+
+def test_trailing_garbage_is_a_miss(tmp_path):
+    path = tmp_path / "entity_lists.bin"
+    write_entity_cache(str(path), FINGERPRINT, SECTIONS)
+    path.write_bytes(path.read_bytes() + b"junk")
+    assert read_entity_cache(str(path), FINGERPRINT) is None
+
+def test_write_replaces_existing_cache(tmp_path):
+    path = str(tmp_path / "entity_lists.bin")
+    write_entity_cache(path, FINGERPRINT, SECTIONS)
+    write_entity_cache(path, FINGERPRINT, {"movies": ["sholay"]})
+    assert read_entity_cache(path, FINGERPRINT) == {"movies": ["sholay"]}
+    assert [p.name for p in tmp_path.iterdir()] == ["entity_lists.bin"]
@@ -0,0 +1,108 @@
+import time
+import asyncio
+import pytest
+import llm_calls
+from llm_calls import LLM_CALL_STATS, TurnBudget, generate_content
+from fake_genai import FakeGenaiClient
+
+MODEL = "stub-model"
+FAST = "stub-fast-model"
+
+@pytest.fixture(autouse=True)
+def clear_stats():
+    LLM_CALL_STATS.clear()
+    yield
+    LLM_CALL_STATS.clear()
+
+def use_client(monkeypatch, client):
+    monkeypatch.setattr(llm_calls, "get_genai_client", lambda: client)
+    return client
+
+def spent(budget, seconds):
+    budget.started_at = time.monotonic() - seconds
+    return budget
+
+def test_stage_timeout_is_a_share_of_the_pending_weight():
+    budget = TurnBudget(total_seconds=10.0, stage_shares={"a": 1.0, "b": 3.0})
+    assert budget.stage_timeout("a") == pytest.approx(2.5, abs=0.01)
+    assert budget.stage_timeout("b") == pytest.approx(10.0, abs=0.01)
+
+def test_time_saved_by_a_stage_rolls_over_to_later_ones():
+    budget = spent(TurnBudget(total_seconds=10.0, stage_shares={"a": 1.0, "b": 1.0, "c": 2.0}), 1.0)
+    # "a" would have had 2.5s; the 1.5s it did not use is split between "b" and "c"
+    assert budget.stage_timeout("b") == pytest.approx(3.0, abs=0.01)
+    assert budget.stage_timeout("c") == pytest.approx(9.0, abs=0.01)
+
+def test_unknown_stage_and_spent_budget():
+    budget = TurnBudget(total_seconds=10.0, stage_shares={"a": 1.0})
+    assert budget.stage_timeout("other") == pytest.approx(10.0, abs=0.01)
+    spent(budget, 20.0)
+    assert budget.remaining() == 0.0
+    assert budget.stage_timeout("a") == 0.0
+
+def test_fast_response_sends_no_hedge(monkeypatch):
+    client = use_client(monkeypatch, FakeGenaiClient())
+    response = asyncio.run(generate_content("validation", MODEL, ["q"], hedge_delay=0.05))
+    assert response.text == "answer 0"
+    assert client.started == [MODEL]
+    assert LLM_CALL_STATS["validation.hedge_fired"] == 0
+
+def test_hedge_fires_and_wins(monkeypatch):
+    client = use_client(monkeypatch, FakeGenaiClient(generate_delays=[0.5, 0.0]))
+    response = asyncio.run(generate_content("validation", MODEL, ["q"], hedge_delay=0.05))
+    assert response.text == "answer 1"
+    assert client.started == [MODEL, MODEL]
+    assert LLM_CALL_STATS["validation.hedge_fired"] == 1
+    assert LLM_CALL_STATS["validation.hedge_won"] == 1
+    # The slow first request was cancelled
+    assert len(client.generated) == 1
+
+def test_hedge_covers_a_failed_first_request(monkeypatch):
+    client = use_client(monkeypatch, FakeGenaiClient(generate_delays=[0.1, 0.0],
+                                                     generate_errors=[RuntimeError("boom")]))
+    response = asyncio.run(generate_content("validation", MODEL, ["q"], hedge_delay=0.05))
+    assert response.text == "answer 1"
+    assert LLM_CALL_STATS["validation.hedge_won"] == 1
+
+def test_deadline_raises_timeout(monkeypatch):
+    use_client(monkeypatch, FakeGenaiClient(generate_delays=[1.0]))
+    budget = TurnBudget(total_seconds=0.1, stage_shares={"validation": 1.0})
+    started = time.monotonic()
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(generate_content("validation", MODEL, ["q"], budget=budget, hedge_delay=None))
+    assert time.monotonic() - started < 0.5
+    assert LLM_CALL_STATS["validation.timeout"] == 1
+
+def test_hedge_is_skipped_when_it_would_start_after_the_deadline(monkeypatch):
+    client = use_client(monkeypatch, FakeGenaiClient(generate_delays=[1.0]))
+    budget = TurnBudget(total_seconds=0.1, stage_shares={"validation": 1.0})
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(generate_content("validation", MODEL, ["q"], budget=budget, hedge_delay=0.5))
+    assert client.started == [MODEL]
+
+def test_error_is_raised_when_every_request_fails(monkeypatch):
+    use_client(monkeypatch, FakeGenaiClient(generate_errors=[RuntimeError("boom")]))
+    with pytest.raises(RuntimeError, match="boom"):
+        asyncio.run(generate_content("validation", MODEL, ["q"], hedge_delay=None))
+    assert LLM_CALL_STATS["validation.error"] == 1
+
+def test_fallback_model_is_used_when_the_budget_is_nearly_spent(monkeypatch):
+    client = use_client(monkeypatch, FakeGenaiClient())
+    fresh = TurnBudget(total_seconds=10.0)
+    late = spent(TurnBudget(total_seconds=10.0), 8.0)
+
+    async def run():
+        await generate_content("sql_generation", MODEL, ["q"], budget=fresh, fallback_model=FAST, hedge_delay=None)
+        await generate_content("sql_generation", MODEL, ["q"], budget=late, fallback_model=FAST, hedge_delay=None)
+
+    asyncio.run(run())
+    assert client.started == [MODEL, FAST]
+    assert LLM_CALL_STATS["sql_generation.primary"] == 1
+    assert LLM_CALL_STATS["sql_generation.fallback"] == 1
+
+def test_no_fallback_without_a_fallback_model(monkeypatch):
+    client = use_client(monkeypatch, FakeGenaiClient())
+    late = spent(TurnBudget(total_seconds=10.0), 8.0)
+    asyncio.run(generate_content("final_answer", MODEL, ["q"], budget=late, hedge_delay=None))
+    assert client.started == [MODEL]
+    assert LLM_CALL_STATS["final_answer.fallback"] == 0
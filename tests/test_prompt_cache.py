@@ -0,0 +1,168 @@
+import time
+import asyncio
+from google.genai import types
+import llm_calls
+from fake_genai import FakeGenaiClient
+from prompt_cache import PromptCache
+
+MODEL = "stub-model"
+LONG_INSTRUCTION = "Generate SQL for the movie database. " * 200
+SHORT_INSTRUCTION = "Answer briefly."
+
+def config(instruction=LONG_INSTRUCTION):
+    return types.GenerateContentConfig(system_instruction=instruction, temperature=0.1)
+
+def test_cache_is_created_once_and_reused():
+    client = FakeGenaiClient()
+    cache = PromptCache(client=client)
+
+    async def run():
+        first = await cache.resolve(MODEL, config(), ["question 1"])
+        second = await cache.resolve(MODEL, config(), ["question 2"])
+        return first, second
+
+    (first_config, first_contents, first_name), (_, second_contents, second_name) = asyncio.run(run())
+    assert len(client.created) == 1
+    assert first_name == second_name == "cachedContents/1"
+    assert first_config.system_instruction is None
+    assert first_config.cached_content == first_name
+    assert first_config.temperature == 0.1
+    assert (first_contents, second_contents) == (["question 1"], ["question 2"])
+
+def test_caches_are_per_model_and_instruction():
+    client = FakeGenaiClient()
+    cache = PromptCache(client=client)
+
+    async def run():
+        await cache.resolve(MODEL, config(), ["q"])
+        await cache.resolve("other-model", config(), ["q"])
+        await cache.resolve(MODEL, config(LONG_INSTRUCTION + "!"), ["q"])
+
+    asyncio.run(run())
+    assert len(client.created) == 3
+
+def test_history_prefix_is_cached_in_whole_steps():
+    client = FakeGenaiClient()
+    cache = PromptCache(client=client, history_step=2)
+
+    async def run():
+        results = []
+        for length in range(1, 6):
+            results.append(await cache.resolve(MODEL, config(), [f"m{i}" for i in range(length)]))
+        return results
+
+    results = asyncio.run(run())
+    assert [len(contents) for _, contents, _ in results] == [1, 2, 1, 2, 1]
+    assert [name for _, _, name in results] == [
+        "cachedContents/1", "cachedContents/1", "cachedContents/2", "cachedContents/2", "cachedContents/3",
+    ]
+    assert len(client.created[-1][1].contents) == 4
+
+def test_cache_close_to_expiry_is_refreshed():
+    client = FakeGenaiClient()
+    cache = PromptCache(client=client, ttl_s=3600, refresh_margin_s=300)
+
+    async def run():
+        await cache.resolve(MODEL, config(), ["q"])
+        key, entry = next(iter(cache._entries.items()))
+        cache._entries[key] = entry._replace(expires_at=time.monotonic() + 60)
+        result = await cache.resolve(MODEL, config(), ["q"])
+        await asyncio.gather(*cache._pending.values())
+        return result, cache._entries[key]
+
+    result, entry = asyncio.run(run())
+    assert result[2] == "cachedContents/1"
+    assert client.updated == [("cachedContents/1", "3600s")]
+    assert entry.expires_at > time.monotonic() + 3000
+    assert len(client.created) == 1
+
+def test_expired_cache_is_recreated():
+    client = FakeGenaiClient()
+    cache = PromptCache(client=client)
+
+    async def run():
+        await cache.resolve(MODEL, config(), ["q"])
+        key, entry = next(iter(cache._entries.items()))
+        cache._entries[key] = entry._replace(expires_at=time.monotonic() - 1)
+        return await cache.resolve(MODEL, config(), ["q"])
+
+    assert asyncio.run(run())[2] == "cachedContents/2"
+
+def test_short_instruction_is_sent_inline():
+    client = FakeGenaiClient()
+    cache = PromptCache(client=client)
+    assert asyncio.run(cache.resolve(MODEL, config(SHORT_INSTRUCTION), ["q"])) is None
+    assert client.created == []
+
+def test_failed_creation_falls_back_inline_and_cools_down():
+    client = FakeGenaiClient(fail_create=True)
+    cache = PromptCache(client=client, retry_after_s=600)
+
+    async def run():
+        return [await cache.resolve(MODEL, config(), ["q"]) for _ in range(3)]
+
+    assert asyncio.run(run()) == [None, None, None]
+    assert client.created == []
+
+def test_slow_creation_is_not_awaited_past_the_callers_deadline():
+    client = FakeGenaiClient(create_delay=0.05)
+    cache = PromptCache(client=client, create_timeout_s=5.0)
+
+    async def run():
+        inline = await cache.resolve(MODEL, config(), ["q"], max_wait=0.0)
+        await asyncio.sleep(0.1)
+        cached = await cache.resolve(MODEL, config(), ["q"], max_wait=0.0)
+        return inline, cached
+
+    inline, cached = asyncio.run(run())
+    assert inline is None
+    assert cached[2] == "cachedContents/1"
+
+def test_no_cache_is_created_when_creation_is_not_allowed():
+    client = FakeGenaiClient()
+    cache = PromptCache(client=client)
+    assert asyncio.run(cache.resolve(MODEL, config(), ["q"], create=False)) is None
+    assert client.created == []
+
+def test_generate_content_uses_the_cache_and_recovers_from_a_lost_one(monkeypatch):
+    client = FakeGenaiClient()
+    cache = PromptCache(client=client)
+    monkeypatch.setattr(llm_calls, "get_genai_client", lambda: client)
+    monkeypatch.setattr(llm_calls, "get_prompt_cache", lambda: cache)
+
+    async def call():
+        return await llm_calls.generate_content("sql_generation", MODEL, ["q"], config(),
+                                                hedge_delay=None, cache_prompt=True)
+
+    async def run():
+        await call()
+        client.live_caches.clear()  # the server dropped the cache
+        await call()
+        await call()
+
+    asyncio.run(run())
+    assert [(name, instruction is not None) for name, instruction, _ in client.generated] == [
+        ("cachedContents/1", False),
+        (None, True),
+        ("cachedContents/2", False),
+    ]
+
+def test_generate_content_without_cache_prompt_sends_the_instruction(monkeypatch):
+    client = FakeGenaiClient()
+    monkeypatch.setattr(llm_calls, "get_genai_client", lambda: client)
+    monkeypatch.setattr(llm_calls, "get_prompt_cache", lambda: PromptCache(client=client))
+
+    asyncio.run(llm_calls.generate_content("final_answer", MODEL, ["q"], config(), hedge_delay=None))
+    assert client.created == []
+    assert client.generated[0][0] is None and client.generated[0][1] == LONG_INSTRUCTION
+
+def test_close_deletes_created_caches():
+    client = FakeGenaiClient()
+    cache = PromptCache(client=client)
+
+    async def run():
+        await cache.resolve(MODEL, config(), ["q"])
+        await cache.close()
+
+    asyncio.run(run())
+    assert client.deleted == ["cachedContents/1"]
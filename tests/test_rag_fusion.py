@@ -0,0 +1,61 @@
+from types import SimpleNamespace
+import pytest
+import rag_fusion
+from rag_fusion import fuse_rag_documents
+from rag_search import movie_key
+
+def movie(title, year, genre=(), actors=(), plot=""):
+    return {"Title": title, "Year": year, "Genre": list(genre), "Actors": list(actors), "Plot": plot}
+
+DON_1978 = movie("Don", "1978", ["action"], ["amitabh bachchan"], "smuggler lookalike")
+DON_2006 = movie("Don", "2006", ["action"], ["shah rukh khan"], "crime lord lookalike")
+SHOLAY = movie("Sholay", "1975", ["action"], ["dharmendra"], "bandit village revenge")
+DEEWAAR = movie("Deewaar", "1975", ["crime"], ["amitabh bachchan"], "brothers police smuggler")
+TRISHUL = movie("Trishul", "1978", ["drama"], ["amitabh bachchan"], "construction tycoon father")
+
+@pytest.fixture(autouse=True)
+def entity_lists(monkeypatch):
+    aliases = {"the don": "Don"}
+    monkeypatch.setattr(rag_fusion, "get_entity_lists", lambda: SimpleNamespace(movie_aliases=aliases))
+
+def keys(documents):
+    return [movie_key(document) for document in documents]
+
+def test_movies_found_by_several_prompts_are_merged_and_ranked_first():
+    fused = fuse_rag_documents({
+        "smuggler movies": [DEEWAAR, SHOLAY],
+        "revenge movies": [SHOLAY, TRISHUL],
+    }, mmr_lambda=None)
+    assert keys(fused) == keys([SHOLAY, DEEWAAR, TRISHUL])
+    assert fused[0]["matched_prompts"] == ["smuggler movies", "revenge movies"]
+    assert fused[1]["matched_prompts"] == ["smuggler movies"]
+    assert fused[0]["fused_score"] > fused[1]["fused_score"]
+
+def test_repeated_hits_within_a_prompt_count_once():
+    fused = fuse_rag_documents({"smuggler movies": [DEEWAAR, dict(DEEWAAR), SHOLAY]}, mmr_lambda=None)
+    assert keys(fused) == keys([DEEWAAR, SHOLAY])
+    assert fused[0]["matched_prompts"] == ["smuggler movies"]
+
+def test_source_movie_comes_first_and_outside_the_limit():
+    fused = fuse_rag_documents({
+        "movies like the don": [SHOLAY, DEEWAAR],
+        "the don": [DEEWAAR, DON_1978, DON_2006, TRISHUL],
+    }, limit=2, mmr_lambda=None)
+    # Only the first hit with the aliased title is the source; the remake stays a candidate
+    assert keys(fused) == keys([DON_1978, DEEWAAR, SHOLAY])
+
+def test_limit_caps_the_candidates():
+    results = [DEEWAAR, SHOLAY, TRISHUL, DON_1978, DON_2006]
+    fused = fuse_rag_documents({"amitabh movies": results}, limit=3, mmr_lambda=None)
+    assert keys(fused) == keys(results[:3])
+
+def test_mmr_skips_a_near_duplicate_that_score_ranking_keeps():
+    near_copy = dict(DEEWAAR, Title="Deewaar Returns", Year="1976")
+    results = {"smuggler movies": [DEEWAAR, near_copy, TRISHUL]}
+    assert keys(fuse_rag_documents(results, limit=2, mmr_lambda=None)) == keys([DEEWAAR, near_copy])
+    assert keys(fuse_rag_documents(results, limit=2, mmr_lambda=0.5)) == keys([DEEWAAR, TRISHUL])
+
+def test_mmr_with_lambda_one_matches_score_ranking():
+    results = {"a": [DEEWAAR, SHOLAY, TRISHUL], "b": [TRISHUL, DON_2006]}
+    assert keys(fuse_rag_documents(results, limit=3, mmr_lambda=1.0)) == \
+        keys(fuse_rag_documents(results, limit=3, mmr_lambda=None))
@@ -0,0 +1,24 @@
+from rag_search import movie_key, reciprocal_rank_fusion
+
+DON_1978 = {"Title": "Don", "Year": "1978", "Plot": "a smuggler's lookalike"}
+DON_2006 = {"Title": "don", "Year": "2006", "Plot": "a crime lord's lookalike"}
+SHOLAY = {"Title": "sholay", "Year": "1975"}
+
+def test_movie_key_separates_movies_that_share_a_title():
+    assert movie_key(DON_1978) != movie_key(DON_2006)
+    assert movie_key(DON_2006) == movie_key({"Title": " DON ", "Year": "2006"})
+
+def test_rrf_keeps_same_title_movies_apart():
+    fused = reciprocal_rank_fusion([[DON_1978, SHOLAY], [DON_2006, SHOLAY]])
+    assert fused[0] is SHOLAY
+    assert {movie["Year"] for movie in fused[1:]} == {"1978", "2006"}
+
+def test_rrf_merges_the_same_movie_across_rankings():
+    fused = reciprocal_rank_fusion([[SHOLAY, DON_1978], [dict(DON_1978), SHOLAY]], k=60)
+    assert [movie_key(movie) for movie in fused] == [movie_key(SHOLAY), movie_key(DON_1978)]
+
+def test_rrf_orders_by_summed_reciprocal_rank():
+    a, b, c = ({"Title": t, "Year": "2000"} for t in "abc")
+    fused = reciprocal_rank_fusion([[a, b, c], [c, b]], k=1)
+    # a: 1/2, b: 1/3 + 1/3, c: 1/4 + 1/2
+    assert [movie["Title"] for movie in fused] == ["c", "b", "a"]
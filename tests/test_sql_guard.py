@@ -0,0 +1,115 @@
+import pytest
+from sql_guard import SQLGuardError, validate_statement, enforce_row_limit
+
+ROW_LIMIT = 100
+
+def test_plain_select_is_accepted_without_trailing_semicolon():
+    assert validate_statement("SELECT title FROM movies;") == "SELECT title FROM movies"
+
+def test_with_query_is_accepted():
+    sql = "WITH recent AS (SELECT * FROM movies WHERE year_num > 2020) SELECT title FROM recent"
+    assert validate_statement(sql) == sql
+
+@pytest.mark.parametrize("sql", [
+    "SELECT 1; DROP TABLE movies",
+    "SELECT 1; SELECT 2",
+    "SELECT title FROM movies; -- trailing",
+])
+def test_stacked_statements_are_rejected(sql):
+    with pytest.raises(SQLGuardError):
+        validate_statement(sql)
+
+@pytest.mark.parametrize("sql", [
+    "DELETE FROM movies",
+    "UPDATE movies SET title = 'x'",
+    "SELECT * INTO copy_of_movies FROM movies",
+    "WITH gone AS (DELETE FROM movies RETURNING id) SELECT * FROM gone",
+    "SELECT pg_sleep(10)",
+])
+def test_writes_and_dangerous_functions_are_rejected(sql):
+    with pytest.raises(SQLGuardError):
+        validate_statement(sql)
+
+@pytest.mark.parametrize("sql", [
+    "SELECT title FROM movies WHERE plot ILIKE '%delete%'",
+    "SELECT title FROM movies WHERE plot = 'drop; table'",
+    'SELECT "update" FROM movies',
+    "SELECT $$insert into movies$$",
+])
+def test_keywords_inside_literals_are_allowed(sql):
+    assert validate_statement(sql) == sql
+
+@pytest.mark.parametrize("sql", [
+    "SELECT title FROM movies -- DROP TABLE movies",
+    "SELECT title /* DELETE FROM movies; */ FROM movies",
+])
+def test_keywords_inside_comments_are_ignored(sql):
+    assert validate_statement(sql) == sql
+
+def test_comment_cannot_hide_a_leading_write():
+    with pytest.raises(SQLGuardError):
+        validate_statement("/* SELECT */ DELETE FROM movies")
+
+def test_literal_cannot_hide_a_second_statement_end():
+    with pytest.raises(SQLGuardError):
+        validate_statement("SELECT 'a'; DELETE FROM movies WHERE title = 'b'")
+
+def test_missing_limit_is_appended():
+    assert enforce_row_limit("SELECT title FROM movies", ROW_LIMIT) == f"SELECT title FROM movies\nLIMIT {ROW_LIMIT}"
+
+def test_small_limit_is_kept():
+    sql = "SELECT title FROM movies LIMIT 5 OFFSET 10"
+    assert enforce_row_limit(sql, ROW_LIMIT) == sql
+
+@pytest.mark.parametrize("sql, expected", [
+    ("SELECT title FROM movies LIMIT 500", f"SELECT title FROM movies LIMIT {ROW_LIMIT}"),
+    ("SELECT title FROM movies LIMIT ALL", f"SELECT title FROM movies LIMIT {ROW_LIMIT}"),
+    ("SELECT title FROM movies LIMIT 500 OFFSET 3", f"SELECT title FROM movies LIMIT {ROW_LIMIT} OFFSET 3"),
+])
+def test_large_limit_is_capped(sql, expected):
+    assert enforce_row_limit(sql, ROW_LIMIT) == expected
+
+def test_limit_inside_subquery_does_not_count():
+    sql = "SELECT title FROM movies WHERE id IN (SELECT movie_id FROM movie_actors LIMIT 5)"
+    assert enforce_row_limit(sql, ROW_LIMIT) == f"{sql}\nLIMIT {ROW_LIMIT}"
+
+def test_limit_in_literal_or_comment_does_not_count():
+    sql = "SELECT title FROM movies WHERE plot = 'no limit 5' -- LIMIT 1"
+    assert enforce_row_limit(sql, ROW_LIMIT) == f"{sql}\nLIMIT {ROW_LIMIT}"
+
+@pytest.mark.parametrize("sql", [
+    "SELECT title FROM movies LIMIT 10 * 1000",
+    "SELECT title FROM movies LIMIT (500)",
+])
+def test_computed_limit_is_rejected(sql):
+    with pytest.raises(SQLGuardError):
+        enforce_row_limit(sql, ROW_LIMIT)
+
+@pytest.mark.parametrize("sql, expected", [
+    ("SELECT title FROM movies FETCH FIRST 500 ROWS ONLY",
+     f"SELECT title FROM movies FETCH FIRST {ROW_LIMIT} ROWS ONLY"),
+    ("SELECT title FROM movies ORDER BY title FETCH NEXT 1000 ROW WITH TIES",
+     f"SELECT title FROM movies ORDER BY title FETCH NEXT {ROW_LIMIT} ROW WITH TIES"),
+    ("SELECT title FROM movies FETCH FIRST 20 ROWS ONLY", "SELECT title FROM movies FETCH FIRST 20 ROWS ONLY"),
+    ("SELECT title FROM movies FETCH FIRST ROW ONLY", "SELECT title FROM movies FETCH FIRST ROW ONLY"),
+])
+def test_fetch_first_is_capped(sql, expected):
+    assert enforce_row_limit(sql, ROW_LIMIT) == expected
+
+def test_computed_fetch_count_is_rejected():
+    with pytest.raises(SQLGuardError):
+        enforce_row_limit("SELECT title FROM movies FETCH FIRST (500) ROWS ONLY", ROW_LIMIT)
+
+def test_union_gets_one_limit_for_the_whole_result():
+    sql = "SELECT title FROM movies WHERE year_num = 2000 UNION SELECT title FROM movies WHERE year_num = 2001"
+    assert enforce_row_limit(validate_statement(sql), ROW_LIMIT) == f"{sql}\nLIMIT {ROW_LIMIT}"
+
+def test_union_with_large_trailing_limit_is_capped():
+    sql = "SELECT title FROM movies UNION ALL SELECT name FROM actors LIMIT 10000"
+    assert enforce_row_limit(validate_statement(sql), ROW_LIMIT) == (
+        f"SELECT title FROM movies UNION ALL SELECT name FROM actors LIMIT {ROW_LIMIT}"
+    )
+
+def test_union_with_write_is_rejected():
+    with pytest.raises(SQLGuardError):
+        validate_statement("SELECT title FROM movies UNION SELECT 1 FROM (DELETE FROM movies RETURNING 1) d")